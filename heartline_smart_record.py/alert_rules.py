@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+
+from data_access import as_patient
+from vitals_matrix import matrix_for
+
+RULES_FILE = os.path.join(os.path.dirname(__file__), "alert_rules.json")
+
+# Severity names by rank; a patient's rank is the most severe tier any vital breaks.
+SEVERITIES = ("normal", "info", "warning", "critical")
+VITALS = ("HR", "BP", "Temp")
+VITAL_BITS = {vital: 1 << index for index, vital in enumerate(VITALS)}
+
+# Rule measure -> (vital it flags, parsed column on Patient and VitalsMatrix)
+MEASURES = {
+    "HR": ("HR", "hr"),
+    "systolic": ("BP", "systolic"),
+    "diastolic": ("BP", "diastolic"),
+    "Temp": ("Temp", "temp_f"),
+}
+COLUMNS = ("hr", "systolic", "diastolic", "temp_f")
+
+log = logging.getLogger(__name__)
+
+# Used when alert_rules.json is missing, unreadable or invalid.
+DEFAULT_RULES = {
+    "critical": {"HR": [45, 130], "systolic": [85, 170], "diastolic": [45, 110]},
+    "warning": {"HR": [40, 110], "systolic": [90, 150], "diastolic": [50, 100], "Temp": [94.0, 102.0]},
+    "info": {"Temp": [95.0, 100.4]},
+}
+
+
+class RuleSet:
+    """Alert thresholds compiled into one flat list of range checks.
+
+    tiers maps a severity name to {measure: [low, high]}; a value outside the
+    range raises the patient to that severity and flags the vital. evaluate()
+    checks one patient and assess() a whole roster, each in a single pass.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        checks = []
+        for severity, limits in tiers.items():
+            if severity not in SEVERITIES[1:]:
+                raise ValueError(f"Unknown alert severity {severity!r}")
+            for measure, (low, high) in limits.items():
+                if measure not in MEASURES:
+                    raise ValueError(f"Unknown alert measure {measure!r}")
+                vital, column = MEASURES[measure]
+                checks.append((COLUMNS.index(column), float(low), float(high), SEVERITIES.index(severity), VITAL_BITS[vital]))
+        # Most severe first, so the first breach found sets the patient's rank.
+        self._checks = tuple(sorted(checks, key=lambda check: -check[3]))
+        self._assessed = (None, None)
+
+    def _scan(self, values):
+        rank = flags = 0
+        for index, low, high, tier, bit in self._checks:
+            value = values[index]
+            if value < low or value > high:
+                flags |= bit
+                if not rank:
+                    rank = tier
+        return rank, flags
+
+    def evaluate(self, patient):
+        """(severity rank, flagged-vital bits) for one patient."""
+        patient = as_patient(patient)
+        return self._scan((patient.hr, patient.systolic, patient.diastolic, patient.temp_f))
+
+    def assess(self, patient_list):
+        """Assessment of every patient, cached until the roster's matrix changes."""
+        matrix = matrix_for(patient_list)
+        if self._assessed[0] is matrix:
+            return self._assessed[1]
+        np = matrix.np
+        if np is None:
+            results = [self._scan(values) for values in zip(*(getattr(matrix, column) for column in COLUMNS))]
+            ranks = [rank for rank, _ in results]
+            flags = [bits for _, bits in results]
+        else:
+            ranks = np.zeros(len(matrix), dtype=np.int8)
+            flags = np.zeros(len(matrix), dtype=np.int8)
+            for index, low, high, tier, bit in self._checks:
+                outside = matrix.outside(COLUMNS[index], low, high)
+                np.maximum(ranks, tier, out=ranks, where=outside)
+                np.bitwise_or(flags, bit, out=flags, where=outside)
+            ranks = ranks.tolist()
+            flags = flags.tolist()
+        assessment = Assessment(matrix.patients, ranks, flags)
+        self._assessed = (matrix, assessment)
+        return assessment
+
+
+class Assessment:
+    """Severity rank and flagged-vital bits for every patient in a roster."""
+
+    def __init__(self, patients, ranks, flags):
+        self.patients = patients
+        self.ranks = ranks
+        self.flags = flags
+
+    def rows(self, vital=None):
+        """Indexes of patients with vital flagged, or with any alert when vital is None."""
+        if vital is None:
+            return [index for index, rank in enumerate(self.ranks) if rank]
+        bit = VITAL_BITS[vital]
+        return [index for index, flags in enumerate(self.flags) if flags & bit]
+
+    def select(self, vital=None):
+        return [self.patients[index] for index in self.rows(vital)]
+
+    def count(self, vital=None):
+        return len(self.rows(vital))
+
+    def flagged(self, index, vital):
+        return bool(self.flags[index] & VITAL_BITS[vital])
+
+
+def alert_for(patient, rank, flags):
+    """The alert row for a patient with a non-zero severity rank."""
+    details = [f"{vital} {patient[vital]}" for vital in VITALS if flags & VITAL_BITS[vital]]
+    return {
+        "patient_id": patient["patient_id"],
+        "name": patient["name"],
+        "severity": SEVERITIES[rank],
+        "details": ", ".join(details),
+    }
+
+
+class AlertBoard:
+    """Live alerts by patient_id, kept current one patient at a time.
+
+    load() assesses a whole roster; after that update() re-evaluates only the
+    patient it is given. Both return what moved as (event, alert) pairs, event
+    being "added", "changed" or "cleared", and pass each pair to subscribers.
+    Until load() is called update() does nothing.
+    """
+
+    def __init__(self):
+        self.rules = None
+        self.alerts = {}
+        self.loaded = False
+        self._patients = ()
+        self._listeners = []
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, events):
+        for event, alert in events:
+            for listener in list(self._listeners):
+                listener(event, alert)
+        return events
+
+    def _set(self, patient_id, alert):
+        previous = self.alerts.get(patient_id)
+        if alert is None:
+            if previous is None:
+                return None
+            del self.alerts[patient_id]
+            return ("cleared", previous)
+        self.alerts[patient_id] = alert
+        if previous is None:
+            return ("added", alert)
+        if previous != alert:
+            return ("changed", alert)
+        return None
+
+    def load(self, patient_list, rules=None):
+        self.rules = rules or rules_for()
+        self._patients = patient_list
+        self.loaded = True
+        assessment = self.rules.assess(patient_list)
+        current = {}
+        for index in assessment.rows():
+            patient = assessment.patients[index]
+            current[patient["patient_id"]] = alert_for(patient, assessment.ranks[index], assessment.flags[index])
+        events = [self._set(patient_id, None) for patient_id in list(self.alerts) if patient_id not in current]
+        events.extend(self._set(patient_id, alert) for patient_id, alert in current.items())
+        return self._emit([event for event in events if event is not None])
+
+    def set_rules(self, rules):
+        """Switch rule sets and re-assess the loaded roster."""
+        return self.load(self._patients, rules)
+
+    def update(self, patient):
+        if not self.loaded:
+            return []
+        rank, flags = self.rules.evaluate(patient)
+        event = self._set(patient["patient_id"], alert_for(patient, rank, flags) if rank else None)
+        return self._emit([event] if event is not None else [])
+
+
+def _merge(base, override):
+    merged = {severity: dict(limits) for severity, limits in base.items()}
+    for severity, limits in override.items():
+        merged.setdefault(severity, {}).update(limits)
+    return merged
+
+
+def _read_config(filename):
+    try:
+        with open(filename, "r", encoding="utf-8") as config_file:
+            return json.load(config_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"default": DEFAULT_RULES}
+
+
+_COMPILED = {}
+
+
+def rules_for(unit=None, role=None, filename: str = RULES_FILE):
+    """The RuleSet for a unit and role: defaults, then unit overrides, then role overrides.
+
+    A config that does not compile falls back to DEFAULT_RULES. Compiled rule sets are reused until the config file changes.
+    """
+    try:
+        signature = os.stat(filename).st_mtime_ns
+    except OSError:
+        signature = None
+    key = (filename, unit, role)
+    cached = _COMPILED.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    config = _read_config(filename)
+    try:
+        if not isinstance(config, dict):
+            raise TypeError("the config must be a JSON object")
+        tiers = _merge(config.get("default", DEFAULT_RULES), config.get("units", {}).get(unit, {}))
+        tiers = _merge(tiers, config.get("roles", {}).get(role, {}))
+        rules = RuleSet(tiers)
+    except (ValueError, TypeError, AttributeError) as exc:
+        # One typo in the config must not stop the alerts, or the app, from starting.
+        log.warning("%s: invalid alert rules (%s); using the defaults", filename, exc)
+        rules = RuleSet(DEFAULT_RULES)
+    _COMPILED[key] = (signature, rules)
+    return rules
+
+
+def assess(patient_list, rules=None):
+    return (rules or rules_for()).assess(patient_list)
+
+
+BOARD = AlertBoard()
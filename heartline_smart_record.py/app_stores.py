@@ -0,0 +1,40 @@
+import threading
+
+from sqlite_cache import warm_load
+
+STORE_NAMES = ("tasks", "timeline", "soft_notes", "patient_files", "medications", "team_messages")
+
+
+class LazyStores:
+    """Loads each store the first time it is asked for.
+
+    Attribute access (stores.tasks) blocks until that one store is loaded;
+    prefetch() warms the rest on a background thread so they are usually
+    ready before anyone clicks.
+    """
+
+    def __init__(self, preloaded=None, loader=warm_load):
+        self._loader = loader
+        self._values = {name: value for name, value in (preloaded or {}).items() if value is not None}
+        self._locks = {name: threading.Lock() for name in STORE_NAMES}
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = self._loader(name)
+        return self._values[name]
+
+    def __getattr__(self, name):
+        if name in STORE_NAMES:
+            return self.get(name)
+        raise AttributeError(name)
+
+    def loaded(self):
+        return dict(self._values)
+
+    def prefetch(self, names=STORE_NAMES):
+        thread = threading.Thread(target=lambda: [self.get(name) for name in names], name="store-prefetch", daemon=True)
+        thread.start()
+        return thread
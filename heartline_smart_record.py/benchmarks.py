@@ -0,0 +1,397 @@
+"""Rough timings for Smart Record's storage and lookup paths.
+
+Run ``python benchmarks.py <name>`` from this folder; every benchmark works on
+synthetic data in a temporary directory and never touches real patient files.
+``python benchmarks.py --check`` exits non-zero when an entry point's cold
+import goes over its STARTUP_BUDGET_MS or pulls in a deferred module, or when
+an as-you-type suggestion takes longer than SUGGEST_BUDGET_MS.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import alert_rules
+import codec
+import downsample
+import patient_ops
+import search_index
+import vitals_matrix
+from data_access import Patient, PatientRegistry
+
+
+def _timed(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def _sample_timeline(count):
+    return [
+        {
+            "timestamp": f"2025-11-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}",
+            "patient_id": f"{i % 500:04d}",
+            "event": "Vitals Update",
+            "description": f"HR {60 + i % 60}, BP {100 + i % 60}/{60 + i % 30}, Temp 98.{i % 10}, Dx flu",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_codecs(records=20000, repeat=5):
+    data = _sample_timeline(records)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.bin")
+
+        def legacy_save():
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+        def legacy_load():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        save_ms, _ = _timed(legacy_save, repeat)
+        size = os.path.getsize(path)
+        load_ms, _ = _timed(legacy_load, repeat)
+        rows.append(("json indent=2 (old)", save_ms, load_ms, size))
+
+        for name in codec.CODECS:
+            save_ms, _ = _timed(lambda: codec.write_file(data, path, name), repeat)
+            size = os.path.getsize(path)
+            load_ms, loaded = _timed(lambda: codec.read_file(path), repeat)
+            assert loaded == data
+            rows.append((name, save_ms, load_ms, size))
+
+    print(f"{records} timeline records, best of {repeat}")
+    print(f"{'codec':<22}{'save ms':>10}{'load ms':>10}{'bytes':>12}")
+    for name, save_ms, load_ms, size in rows:
+        print(f"{name:<22}{save_ms:>10.1f}{load_ms:>10.1f}{size:>12}")
+    return rows
+
+
+FIRST_NAMES = ["john", "mary", "james", "patricia", "robert", "jennifer", "michael", "linda", "william", "elizabeth"]
+LAST_NAMES = ["smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis", "rodriguez", "martinez",
+              "hernandez", "lopez", "gonzalez", "wilson", "anderson", "thomas", "taylor", "moore", "jackson", "martin"]
+
+
+def _sample_stores(patients):
+    diagnoses = ["flu", "pneumonia", "sepsis", "CHF exacerbation", "hip fracture", "asthma"]
+    roster = [
+        {
+            "patient_id": f"{i:05d}",
+            "name": f"{FIRST_NAMES[i % 10].title()} {LAST_NAMES[i // 10 % 20].title()}{i // 200 or ''}",
+            "DOB": "01/01/1960",
+            "Diagnosis": diagnoses[i % len(diagnoses)],
+            "CC": "shortness of breath" if i % 3 else "chest pain",
+        }
+        for i in range(patients)
+    ]
+    tasks = [
+        {"id": f"t{i}", "patient_id": f"{i % patients:05d}", "description": f"Recheck vitals and ambulate {i}"}
+        for i in range(patients * 2)
+    ]
+    timeline = _sample_timeline(patients * 4)
+    return roster, tasks, timeline
+
+
+def _substring_scan(query, patients, tasks, timeline):
+    """The search loop open_search_center ran before the index existed."""
+    query = query.lower()
+    match = lambda text: query in str(text).lower()
+    hits = [p for p in patients if match(p["patient_id"]) or match(p["name"]) or match(p["Diagnosis"]) or match(p["CC"])]
+    hits += [t for t in tasks if match(t["description"]) or match(t["patient_id"])]
+    hits += [e for e in timeline if match(e["description"]) or match(e["patient_id"])]
+    return hits
+
+
+def bench_search(patients=10000, repeat=5):
+    roster, tasks, timeline = _sample_stores(patients)
+    index = search_index.SearchIndex()
+    build_ms, documents = _timed(lambda: index.build(roster, tasks, timeline), 1)
+    print(f"{documents} records indexed in {build_ms:.1f} ms, best of {repeat}")
+    print(f"{'query':<18}{'scan ms':>10}{'index ms':>10}{'hits':>8}")
+    rows = []
+    for query in ("00042", "pneumonia", "garcia", "chest pain", "sepsis 00014"):
+        scan_ms, scanned = _timed(lambda: _substring_scan(query, roster, tasks, timeline), repeat)
+        index_ms, results = _timed(lambda: index.search(query, limit=200), repeat)
+        rows.append((query, scan_ms, index_ms, len(results)))
+        print(f"{query:<18}{scan_ms:>10.2f}{index_ms:>10.2f}{len(results):>8}")
+    return rows
+
+
+def _sample_roster(patients, record=Patient):
+    """Mostly stable vitals with roughly one patient in twenty out of range."""
+    return PatientRegistry(
+        record({
+            "patient_id": f"{i:05d}",
+            "name": f"{FIRST_NAMES[i % 10].title()} {LAST_NAMES[i // 10 % 20].title()}",
+            "DOB": "01/01/1960",
+            "HR": 60 + i % 40 if i % 23 else 135,
+            "BP": f"{110 + i % 30}/{70 + i % 15}" if i % 31 else "182/115",
+            "Temp": 98.0 + (i % 10) / 10 if i % 37 else 101.2,
+            "CC": "",
+            "Diagnosis": "",
+            "RN_AP": "RN",
+            "Time": "08:00 AM",
+        })
+        for i in range(patients)
+    )
+
+
+def _is_abnormal_hr(hr, low=40, high=110):
+    try:
+        hr_val = int(hr)
+    except (ValueError, TypeError):
+        return False
+    return hr_val < low or hr_val > high
+
+
+def _is_abnormal_bp(bp, sys_low=90, sys_high=150, dias_low=50, dias_high=100):
+    try:
+        systolic, diastolic = map(int, bp.split("/"))
+    except (ValueError, AttributeError):
+        return False
+    return systolic < sys_low or systolic > sys_high or diastolic < dias_low or diastolic > dias_high
+
+
+def _is_abnormal_temp(temp, low=95.0, high=100.4):
+    try:
+        temp_val = float(temp)
+    except (ValueError, TypeError):
+        return False
+    return temp_val < low or temp_val > high
+
+
+def _legacy_priority_alerts(patient_list):
+    """priority_alerts before the rule engine: up to six parses and checks per patient."""
+    alerts = []
+    for patient in patient_list:
+        severity = None
+        details = []
+        if _is_abnormal_hr(patient["HR"], low=45, high=130):
+            details.append(f"HR {patient['HR']}")
+            severity = "critical"
+        elif _is_abnormal_hr(patient["HR"]):
+            details.append(f"HR {patient['HR']}")
+            severity = severity or "warning"
+        if _is_abnormal_bp(patient["BP"], sys_low=85, sys_high=170, dias_low=45, dias_high=110):
+            details.append(f"BP {patient['BP']}")
+            severity = "critical"
+        elif _is_abnormal_bp(patient["BP"]):
+            details.append(f"BP {patient['BP']}")
+            severity = severity or "warning"
+        if _is_abnormal_temp(patient["Temp"], low=94.0, high=102.0):
+            details.append(f"Temp {patient['Temp']}")
+            severity = severity or "warning"
+        elif _is_abnormal_temp(patient["Temp"]):
+            details.append(f"Temp {patient['Temp']}")
+            severity = severity or "info"
+        if details:
+            alerts.append({"patient_id": patient["patient_id"], "severity": severity or "info"})
+    return alerts
+
+
+def _roster_bytes(patients, record):
+    tracemalloc.start()
+    try:
+        roster = _sample_roster(patients, record)
+        return tracemalloc.get_traced_memory()[0], roster
+    finally:
+        tracemalloc.stop()
+
+
+def _legacy_counts(patient_list):
+    return (
+        sum(1 for patient in patient_list if _is_abnormal_hr(patient["HR"])),
+        sum(1 for patient in patient_list if _is_abnormal_bp(patient["BP"])),
+    )
+
+
+def _unit_refresh(roster):
+    """Alerts plus HR/BP counts from one fresh assessment of the roster."""
+    roster.changed(None)
+    return patient_ops.priority_alerts(roster), patient_ops.count_abnormal_HR(roster), patient_ops.count_abnormal_BP(roster)
+
+
+def _board_update(board, patient):
+    """Flip one patient between normal and critical HR and push it through the board."""
+    patient["HR"] = 72 if patient.hr > 130 else 140
+    return board.update(patient)
+
+
+def bench_vitals(patients=10000, repeat=5):
+    dict_bytes, dict_roster = _roster_bytes(patients, dict)
+    patient_bytes, roster = _roster_bytes(patients, Patient)
+    backend = "NumPy" if vitals_matrix.optional_numpy() is not None else "pure Python"
+    print(f"roster memory: {dict_bytes / patients:.0f} B/patient as dicts, {patient_bytes / patients:.0f} B as Patient records")
+    rules = alert_rules.rules_for()
+    same = [(a["patient_id"], a["severity"]) for a in _legacy_priority_alerts(roster)] == [
+        (a["patient_id"], a["severity"]) for a in patient_ops.priority_alerts(roster)
+    ]
+    print(f"rule engine alerts match the multi-pass checks: {same}")
+    board = alert_rules.AlertBoard()
+    board.load(roster, rules)
+    rows = [
+        ("matrix from dict rows (parse)", _timed(lambda: vitals_matrix.VitalsMatrix(dict_roster), repeat)[0]),
+        ("matrix from Patient records", _timed(lambda: vitals_matrix.VitalsMatrix(roster), repeat)[0]),
+        ("alerts, multi-pass per patient", _timed(lambda: _legacy_priority_alerts(roster), repeat)[0]),
+        ("alerts + HR/BP counts, multi-pass", _timed(
+            lambda: (_legacy_priority_alerts(roster), _legacy_counts(roster)), repeat
+        )[0]),
+        ("rules.evaluate per patient", _timed(lambda: [rules.evaluate(p) for p in roster], repeat)[0]),
+        ("alerts + HR/BP counts, one assessment", _timed(lambda: _unit_refresh(roster), repeat)[0]),
+        ("alert board, load whole roster", _timed(
+            lambda: (roster.changed(None), alert_rules.AlertBoard().load(roster, rules)), repeat
+        )[0]),
+        ("alert board, update one patient", _timed(lambda: _board_update(board, roster[0]), repeat)[0]),
+    ]
+    print(f"{patients} patients, {backend} backend, best of {repeat}")
+    for label, elapsed_ms in rows:
+        print(f"{label:<38}{elapsed_ms:>10.2f} ms")
+    return rows
+
+
+def _sample_trend(points):
+    """q15-minute vitals for `points` readings, with one HR spike a third of the way in."""
+    np = vitals_matrix.optional_numpy()
+    timestamps = [1_700_000_000 + i * 900 for i in range(points)]
+    hr = [75 + (i * 7919) % 11 - 5 for i in range(points)]
+    hr[points // 3] = 160
+    if np is not None:
+        return np.asarray(timestamps, dtype=float), np.asarray(hr)
+    return timestamps, hr
+
+
+def bench_trend(width=800, repeat=5):
+    """Time to cut a trend to a chart's pixel width: the output, and so the draw, stays the same size."""
+    backend = "NumPy" if vitals_matrix.optional_numpy() is not None else "pure Python"
+    print(f"trend downsampling to {width} px, {backend} backend, best of {repeat}")
+    print(f"{'readings':>10}{'method':>8}{'ms':>10}{'kept':>8}  spike kept")
+    rows = []
+    for points in (1_000, 10_000, 100_000):
+        x, y = _sample_trend(points)
+        for name, reduce in downsample.METHODS.items():
+            elapsed_ms, (_, kept) = _timed(lambda: reduce(x, y, width), repeat)
+            print(f"{points:>10}{name:>8}{elapsed_ms:>10.2f}{len(kept):>8}  {max(kept) == 160}")
+            rows.append((points, name, elapsed_ms, len(kept)))
+    return rows
+
+
+# As-you-type suggestions must come back within this many ms on the 10k-patient sample.
+SUGGEST_BUDGET_MS = 20
+SUGGEST_QUERIES = ("j", "jo", "jonh", "smtih", "mary jon", "00042", "sepsi", "pnuemonia", "rech", "garcia fl")
+
+
+def bench_suggest(patients=10000, repeat=5):
+    """Fuzzy as-you-type lookups over patients and tasks; returns queries over budget."""
+    roster, tasks, _ = _sample_stores(patients)
+    index = search_index.FuzzyIndex()
+    build_ms, documents = _timed(lambda: index.build(roster, tasks), 1)
+    print(f"{documents} records indexed for suggestions in {build_ms:.1f} ms, best of {repeat}")
+    print(f"{'query':<14}{'ms':>8}  top match")
+    failures = []
+    for query in SUGGEST_QUERIES:
+        elapsed_ms, results = _timed(lambda: index.search(query), repeat)
+        top = f"{results[0].label} ({results[0].details})" if results else "-"
+        print(f"{query:<14}{elapsed_ms:>8.2f}  {top}")
+        if elapsed_ms > SUGGEST_BUDGET_MS:
+            failures.append(f"suggest {query!r} took {elapsed_ms:.1f} ms (budget {SUGGEST_BUDGET_MS} ms)")
+    return failures
+
+
+# Entry point -> cumulative import budget in ms (best of several cold interpreters).
+STARTUP_BUDGET_MS = {
+    "cli_app": 150,
+    "vitals": 150,
+    "gui_app": 600,
+}
+# Modules that must load on first use (chart, photo or window), never at import.
+DEFERRED_MODULES = {
+    "cli_app": ("tkinter", "ttkbootstrap", "matplotlib", "PIL", "numpy"),
+    "vitals": ("tkinter", "ttkbootstrap", "matplotlib", "PIL", "numpy", "gui_app"),
+    "gui_app": ("matplotlib", "PIL", "numpy"),
+}
+
+
+def _import_profile(module):
+    """Cumulative import time in ms per top-level module, from ``python -X importtime``."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)), PYTHONDONTWRITEBYTECODE="1")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise ImportError(proc.stderr.strip().splitlines()[-1])
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative) / 1000
+    return profile
+
+
+def bench_startup(repeat=5):
+    """Cold-import each entry point and compare it with its budget; returns failures."""
+    failures = []
+    print(f"Entry point import time, best of {repeat}")
+    print(f"{'module':<12}{'ms':>8}{'budget':>8}  slowest imports")
+    for module, budget in STARTUP_BUDGET_MS.items():
+        try:
+            profiles = [_import_profile(module) for _ in range(repeat)]
+        except ImportError as exc:
+            print(f"{module:<12}{'-':>8}{budget:>8}  skipped: {exc}")
+            continue
+        best = min(profiles, key=lambda profile: profile[module])
+        slowest = sorted((name for name in best if name != module), key=best.get, reverse=True)[:3]
+        print(f"{module:<12}{best[module]:>8.1f}{budget:>8}  " + ", ".join(f"{name} {best[name]:.1f}" for name in slowest))
+        if best[module] > budget:
+            failures.append(f"{module} took {best[module]:.1f} ms (budget {budget} ms)")
+        loaded = [name for name in DEFERRED_MODULES[module] if name in best]
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} at startup")
+    return failures
+
+
+BENCHMARKS = {
+    "codecs": bench_codecs,
+    "startup": bench_startup,
+    "search": bench_search,
+    "suggest": bench_suggest,
+    "vitals": bench_vitals,
+    "trend": bench_trend,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--check", action="store_true", help="only check latency budgets; exit 1 on a regression")
+    args = parser.parse_args()
+    unknown = sorted(set(args.names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    if args.check:
+        failures = bench_startup() + bench_suggest()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1 if failures else 0)
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
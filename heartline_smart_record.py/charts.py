@@ -0,0 +1,278 @@
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from tkinter import messagebox
+
+import ttkbootstrap as ttk
+
+import downsample
+import history_store
+from data_access import as_patient
+from patient_ops import trend_series
+from utils import optional_numpy
+
+RENDER_CACHE_SIZE = 8
+# Full-resolution series are kept for zooming, so hold fewer of them.
+TREND_CACHE_SIZE = 16
+# "minmax" keeps every spike; "lttb" keeps the line's shape with half the points.
+TREND_DOWNSAMPLE = "minmax"
+SECONDS_PER_DAY = 86400.0
+
+OVERVIEW_LABELS = ("Heart Rate", "Blood Pressure", "Temperature")
+OVERVIEW_COLORS = ("#f48fb1", "#f6bd60", "#9cc5c9")
+CARE_NOTES = "\n".join(
+    [
+        "How to use:",
+        "• Hover over spikes for coaching opportunities.",
+        "• Sync with SBAR cards before handoff.",
+        "• Review HR/BP trends to prioritize rounding order.",
+    ]
+)
+
+_MPL = None
+
+
+def _matplotlib():
+    """(Figure, FigureCanvasTkAgg, NavigationToolbar2Tk), imported when the first chart opens."""
+    global _MPL
+    if _MPL is None:
+        import matplotlib
+
+        # Figures render off screen with Agg and are blitted into Tk; pyplot never opens a window of its own.
+        matplotlib.use("Agg")
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from matplotlib.figure import Figure
+
+        _MPL = (Figure, FigureCanvasTkAgg, NavigationToolbar2Tk)
+    return _MPL
+
+
+class Chart:
+    """A chart window whose Figure and artists are built once and then only updated.
+
+    build(figure) lays out the axes and returns the artists; update(artists, data)
+    moves them onto new data with set_data, set_height and the like rather than
+    plotting again. The figure is embedded with FigureCanvasTkAgg in a Toplevel
+    that is raised, not recreated, while it stays open. While it does, renders
+    are kept by key and canvas size, so showing a key seen before blits its
+    saved pixels; reopening the window starts a new canvas and an empty cache.
+    """
+
+    def __init__(self, title, figsize, build, update, toolbar=False):
+        self.title = title
+        self.figsize = figsize
+        self.toolbar = toolbar
+        self._build = build
+        self._update = update
+        self.figure = None
+        self.artists = None
+        self.window = None
+        self.canvas = None
+        self._rendered = OrderedDict()
+
+    def _open(self):
+        Figure, FigureCanvasTkAgg, NavigationToolbar2Tk = _matplotlib()
+        if self.figure is None:
+            self.figure = Figure(figsize=self.figsize)
+            self.artists = self._build(self.figure)
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            return
+        self.window = ttk.Toplevel()
+        self.window.title(self.title)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        # Saved pixels belong to the canvas they were copied from.
+        self._rendered.clear()
+        if self.toolbar:
+            NavigationToolbar2Tk(self.canvas, self.window, pack_toolbar=False).pack(side="bottom", fill="x")
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+
+    def show(self, data, key=None):
+        self._open()
+        self._update(self.artists, data)
+        cache_key = None if key is None else (key, tuple(self.figure.bbox.size))
+        saved = self._rendered.get(cache_key)
+        if saved is not None:
+            self._rendered.move_to_end(cache_key)
+            self.canvas.restore_region(saved)
+            self.canvas.blit()
+            return
+        self.canvas.draw()
+        if cache_key is not None:
+            self._rendered[cache_key] = self.canvas.copy_from_bbox(self.figure.bbox)
+            while len(self._rendered) > RENDER_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+
+
+def _build_trend(figure):
+    import matplotlib.dates as mdates
+
+    axes = figure.add_subplot()
+    lines = (
+        axes.plot([], [], marker="o", markersize=3, label="HR")[0],
+        axes.plot([], [], label="Systolic BP")[0],
+        axes.plot([], [], label="Diastolic BP")[0],
+    )
+    # Real time axis in local time; the locator picks a handful of ticks at any zoom.
+    tz = datetime.now().astimezone().tzinfo
+    locator = mdates.AutoDateLocator(tz=tz)
+    axes.xaxis.set_major_locator(locator)
+    axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator, tz=tz))
+    axes.set_xlabel("Time")
+    axes.set_ylabel("Vitals")
+    axes.legend()
+    trend = {"axes": axes, "lines": lines, "series": None}
+    # Zooming or panning re-decimates the new range from the full-resolution series.
+    axes.callbacks.connect("xlim_changed", lambda _axes: _decimate_trend(trend))
+    return trend
+
+
+def _decimate_trend(trend):
+    """Point each line at at most two points per pixel column of the visible range."""
+    if trend["series"] is None:
+        return
+    axes = trend["axes"]
+    x, *columns = trend["series"]
+    first, stop = downsample.visible(x, *axes.get_xlim())
+    width = max(1, int(axes.bbox.width))
+    reduce = downsample.METHODS[TREND_DOWNSAMPLE]
+    for line, y in zip(trend["lines"], columns):
+        line.set_data(*reduce(x[first:stop], y[first:stop], width))
+
+
+def _date_numbers(timestamps):
+    """Epoch seconds to Matplotlib date numbers (days since its epoch)."""
+    import matplotlib.dates as mdates
+
+    offset = mdates.date2num(datetime.fromtimestamp(0).astimezone())
+    np = optional_numpy()
+    if np is not None:
+        return np.asarray(timestamps, dtype=float) / SECONDS_PER_DAY + offset
+    return [timestamp / SECONDS_PER_DAY + offset for timestamp in timestamps]
+
+
+def _update_trend(trend, data):
+    patient_id, (timestamps, *columns) = data
+    x = _date_numbers(timestamps)
+    trend["series"] = (x, *columns)
+    axes = trend["axes"]
+    axes.set_title(f"Vitals Trend for Patient {patient_id}")
+    # Limits come from the full series, so decimation never changes the framing.
+    pad = max((x[-1] - x[0]) * 0.02, 1 / 48)
+    np = optional_numpy()
+    lowest, highest = (np.min, np.max) if np is not None else (min, max)
+    low = min(lowest(column) for column in columns)
+    high = max(highest(column) for column in columns)
+    axes.set_ylim(low - 5, high + 5)
+    axes.set_xlim(x[0] - pad, x[-1] + pad, emit=False)
+    _decimate_trend(trend)
+
+
+def _build_overview(figure):
+    axes = figure.add_subplot()
+    bars = axes.bar(OVERVIEW_LABELS, [0] * len(OVERVIEW_LABELS), color=OVERVIEW_COLORS)
+    texts = [axes.text(bar.get_x() + bar.get_width() / 2, 0, "", ha="center", va="bottom") for bar in bars]
+    axes.set_title("Abnormal Vitals Overview")
+    axes.set_ylabel("Patient Count")
+    return axes, bars, texts
+
+
+def _update_overview(artists, values):
+    axes, bars, texts = artists
+    for bar, text, value in zip(bars, texts, values):
+        bar.set_height(value)
+        text.set_y(value + 0.1)
+        text.set_text(str(value))
+    axes.set_ylim(0, max(list(values) + [1]) + 1)
+
+
+def _build_universal(figure):
+    axes = figure.add_subplot()
+    lines = (
+        axes.plot([], [], marker="o", label="HR")[0],
+        axes.plot([], [], marker="s", label="Systolic")[0],
+        axes.plot([], [], marker="^", label="Diastolic")[0],
+    )
+    axes.set_ylabel("Value")
+    axes.set_title("Universal Vitals Chart — Quick Care Pointers")
+    axes.legend()
+    # Leave room under the axes for rotated names and the care notes.
+    figure.subplots_adjust(bottom=0.36)
+    figure.text(0.01, 0.02, CARE_NOTES, ha="left", va="bottom", fontsize=9)
+    return axes, lines
+
+
+def _update_universal(artists, data):
+    axes, lines = artists
+    names, *series = data
+    positions = range(len(names))
+    for line, values in zip(lines, series):
+        line.set_data(positions, values)
+    axes.set_xticks(positions)
+    axes.set_xticklabels(names, rotation=45, ha="right")
+    axes.relim()
+    axes.autoscale_view()
+
+
+TREND = Chart("Vitals Trend", (8, 4), _build_trend, _update_trend, toolbar=True)
+OVERVIEW = Chart("Abnormal Vitals Overview", (6, 4), _build_overview, _update_overview)
+UNIVERSAL = Chart("Universal Vitals Chart", (9, 5), _build_universal, _update_universal)
+
+_TRENDS = OrderedDict()
+_TRENDS_LOCK = threading.Lock()
+
+
+def cached_trend(patient_id):
+    """(history version, series) if the patient's history has not grown since it was read, else None."""
+    version = history_store.history_version(patient_id)
+    with _TRENDS_LOCK:
+        cached = _TRENDS.get(patient_id)
+        if cached is None or cached[0] != version:
+            return None
+        _TRENDS.move_to_end(patient_id)
+        return cached
+
+
+def load_trend(patient):
+    """Read a patient's trend series and remember it; safe to run off the Tk thread."""
+    patient_id = patient["patient_id"]
+    # Take the version first: an append during the read then leaves the entry stale, never wrong.
+    version = history_store.history_version(patient_id)
+    trend = (version, trend_series(patient))
+    with _TRENDS_LOCK:
+        _TRENDS[patient_id] = trend
+        _TRENDS.move_to_end(patient_id)
+        while len(_TRENDS) > TREND_CACHE_SIZE:
+            _TRENDS.popitem(last=False)
+    return trend
+
+
+def show_trend(patient_id, version, series):
+    if not len(series[0]):
+        messagebox.showerror("Not Enough Data", "This patient does not have valid vitals to chart yet.")
+        return
+    TREND.show((patient_id, series), key=(patient_id, version))
+
+
+def show_overview(values):
+    OVERVIEW.show(tuple(values), key=tuple(values))
+
+
+def show_universal(patient_list):
+    if not patient_list:
+        messagebox.showinfo("Info", "No patient data to chart.")
+        return
+    names, hr, systolic, diastolic = [], [], [], []
+    for p in map(as_patient, patient_list):
+        if math.isnan(p.hr) or math.isnan(p.systolic):
+            continue
+        names.append(p["name"])
+        hr.append(p.hr)
+        systolic.append(p.systolic)
+        diastolic.append(p.diastolic)
+    if not names:
+        messagebox.showinfo("Info", "Vitals missing for chart.")
+        return
+    version = getattr(patient_list, "version", None)
+    UNIVERSAL.show((names, hr, systolic, diastolic), key=None if version is None else (id(patient_list), version))
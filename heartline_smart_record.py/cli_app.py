@@ -1,4 +1,5 @@
 from data_access import load_from_csv
+import persistence
 from patient_ops import (
     add_patient,
     view_patients,
@@ -53,6 +54,7 @@ def run_cli():
         elif choice == "7":
             export_report(patient_list)
         elif choice == "8":
+            persistence.flush()
             typeprint("It's a good day to save lives! See you later!!")
             break
         else:
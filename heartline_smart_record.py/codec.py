@@ -0,0 +1,65 @@
+import json
+import marshal
+import pickle
+import struct
+
+# Binary payloads start with MAGIC, a format version and a codec id; anything
+# else is read as JSON so older indent=2 files keep loading.
+MAGIC = b"SRC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<3sBB")
+
+DEFAULT_CODEC = "json"
+DECODE_ERRORS = (ValueError, EOFError, TypeError, pickle.UnpicklingError)
+
+
+def _json_dumps(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(body):
+    return json.loads(body.decode("utf-8"))
+
+
+# name -> (codec id written in the header, encoder, decoder); id 0 means headerless JSON.
+CODECS = {
+    "json": (0, _json_dumps, _json_loads),
+    "marshal": (1, lambda data: marshal.dumps(data, 4), marshal.loads),
+    "pickle": (2, lambda data: pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+}
+_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+
+def dumps(data, codec=None):
+    codec_id, encode, _ = CODECS[codec or DEFAULT_CODEC]
+    body = encode(data)
+    if codec_id == 0:
+        return body
+    return HEADER.pack(MAGIC, FORMAT_VERSION, codec_id) + body
+
+
+def detect(blob):
+    if blob[: len(MAGIC)] == MAGIC and len(blob) >= HEADER.size:
+        _, version, codec_id = HEADER.unpack_from(blob)
+        if version != FORMAT_VERSION or codec_id not in _NAMES:
+            raise ValueError(f"Unsupported store format v{version} codec {codec_id}")
+        return _NAMES[codec_id]
+    return "json"
+
+
+def loads(blob):
+    name = detect(blob)
+    decode = CODECS[name][2]
+    if name == "json":
+        return decode(blob)
+    return decode(blob[HEADER.size :])
+
+
+def read_file(filename):
+    with open(filename, "rb") as f:
+        return loads(f.read())
+
+
+def write_file(data, filename, codec=None):
+    with open(filename, "wb") as f:
+        f.write(dumps(data, codec))
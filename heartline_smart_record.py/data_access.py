@@ -1,6 +1,12 @@
 import csv
 import json
+import math
 import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
 
 CSV_FILE = "patient_list.csv"
 JSON_FILE = "patient_list.json"
@@ -16,52 +22,541 @@ CSV_HEADERS = [
     "RN_AP",
     "Time",
 ]
+VITAL_FIELDS = ("HR", "BP", "Temp")
+CSV_HISTORY_FILE = "patient_list_history.csv"
+DB_SUFFIX = ".db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    DOB TEXT NOT NULL DEFAULT '',
+    CC TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS latest_vitals (
+    patient_id TEXT PRIMARY KEY REFERENCES patients(patient_id) ON DELETE CASCADE,
+    HR TEXT NOT NULL DEFAULT '',
+    BP TEXT NOT NULL DEFAULT '',
+    Temp TEXT NOT NULL DEFAULT '',
+    Diagnosis TEXT NOT NULL DEFAULT '',
+    RN_AP TEXT NOT NULL DEFAULT '',
+    Time TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(name);
+CREATE INDEX IF NOT EXISTS idx_latest_vitals_updated ON latest_vitals(updated_at);
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+SELECT_PATIENTS = """
+SELECT p.patient_id, p.name, p.DOB, v.HR, v.BP, v.Temp, p.CC, v.Diagnosis, v.RN_AP, v.Time
+FROM patients p
+LEFT JOIN latest_vitals v ON v.patient_id = p.patient_id
+"""
+
+
+def _as_text(value):
+    return "" if value is None else str(value)
+
+
+def _vital_text(value):
+    # Vitals repeat heavily across a roster, so share one string per distinct reading.
+    return sys.intern(_as_text(value))
+
+
+def parse_number(value):
+    """An int for whole-number text, else a float; NaN when value does not parse."""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def parse_bp(value):
+    try:
+        systolic, diastolic = map(int, str(value).split("/"))
+    except (ValueError, TypeError):
+        return math.nan, math.nan
+    return systolic, diastolic
+
+
+class Patient(MutableMapping):
+    """One roster row: the text fields as entered plus HR, BP and Temp parsed once.
+
+    hr, systolic, diastolic and temp_f are numbers, NaN where the text did not
+    parse. Mapping access (patient["HR"], get, items, dict(patient)) reads and
+    writes the display strings like the dict rows it replaces; assigning HR,
+    BP or Temp re-parses. Keys outside CSV_HEADERS are kept in extra.
+    """
+
+    __slots__ = (
+        "patient_id",
+        "name",
+        "DOB",
+        "CC",
+        "Diagnosis",
+        "RN_AP",
+        "Time",
+        "_HR",
+        "_BP",
+        "_Temp",
+        "hr",
+        "systolic",
+        "diastolic",
+        "temp_f",
+        "extra",
+    )
+
+    def __init__(self, fields=(), **more):
+        fields = dict(fields, **more)
+        self.extra = None
+        for key in CSV_HEADERS:
+            setattr(self, key, fields.pop(key, ""))
+        if fields:
+            self.extra = fields
+
+    @property
+    def HR(self):
+        return self._HR
+
+    @HR.setter
+    def HR(self, value):
+        self._HR = _vital_text(value)
+        self.hr = parse_number(value)
+
+    @property
+    def BP(self):
+        return self._BP
+
+    @BP.setter
+    def BP(self, value):
+        self._BP = _vital_text(value)
+        self.systolic, self.diastolic = parse_bp(value)
+
+    @property
+    def Temp(self):
+        return self._Temp
+
+    @Temp.setter
+    def Temp(self, value):
+        self._Temp = _vital_text(value)
+        self.temp_f = parse_number(value)
+
+    def __getitem__(self, key):
+        if key in _PATIENT_FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _PATIENT_FIELDS:
+            setattr(self, key, value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _PATIENT_FIELDS or self.extra is None or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self):
+        yield from CSV_HEADERS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(CSV_HEADERS) + len(self.extra or ())
+
+    def __contains__(self, key):
+        return key in _PATIENT_FIELDS or (self.extra is not None and key in self.extra)
+
+    def get(self, key, default=None):
+        if key in _PATIENT_FIELDS:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __repr__(self):
+        return f"Patient({dict(self)!r})"
+
+
+_PATIENT_FIELDS = frozenset(CSV_HEADERS)
+
+
+def as_patient(row):
+    """row itself if it is already a Patient, otherwise a Patient parsed from it."""
+    return row if isinstance(row, Patient) else Patient(row)
+
+
+def coerce_patient_row(row):
+    """Build a Patient from a CSV or store row, with blank HR/Temp read as 0."""
+    hr_value = row.get("HR")
+    temp_value = row.get("Temp")
+    try:
+        row["HR"] = int(hr_value) if hr_value not in (None, "") else 0
+    except ValueError:
+        row["HR"] = 0
+    try:
+        row["Temp"] = float(temp_value) if temp_value not in (None, "") else 0.0
+    except ValueError:
+        row["Temp"] = 0.0
+    row["Time"] = row.get("Time") or row.get("timestamp") or ""
+    return Patient(row)
+
+
+def _read_csv(filename):
+    with open(filename, mode="r", newline="") as file:
+        for row in csv.DictReader(file):
+            yield row
+
+
+def _split_versions(rows):
+    latest = {}
+    superseded = []
+    for row in rows:
+        previous = latest.get(row.get("patient_id"))
+        if previous is not None:
+            superseded.append(previous)
+        latest[row.get("patient_id")] = row
+    return latest, superseded
+
+
+def load_csv_rows(filename: str = CSV_FILE, latest_only=False):
+    """Read the flat CSV; with latest_only, keep just the newest row per patient_id."""
+    if not os.path.isfile(filename):
+        return []
+    if not latest_only:
+        return [coerce_patient_row(row) for row in _read_csv(filename)]
+    latest, _ = _split_versions(_read_csv(filename))
+    return [coerce_patient_row(row) for row in latest.values()]
+
+
+class PatientRegistry(list):
+    """The ordered patient list plus a dict index by patient_id.
+
+    Behaves as a plain list for existing callers; every mutation keeps the
+    index in sync. If an id appears more than once the later row wins, the
+    same last-write-wins rule as the store. version goes up on every change,
+    including in-place edits reported through changed(), so derived views
+    can tell when to rebuild.
+    """
+
+    def __init__(self, patients=()):
+        super().__init__(patients)
+        self.version = 0
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {patient["patient_id"]: patient for patient in self}
+        self.version += 1
+
+    def changed(self, patient):
+        """Record that a listed patient's fields were edited in place."""
+        self.version += 1
+
+    def get(self, patient_id, default=None):
+        return self._by_id.get(patient_id, default)
+
+    def append(self, patient):
+        super().append(patient)
+        self._by_id[patient["patient_id"]] = patient
+        self.version += 1
+
+    def extend(self, patients):
+        patients = list(patients)
+        super().extend(patients)
+        self._by_id.update((patient["patient_id"], patient) for patient in patients)
+        self.version += 1
+
+    def __iadd__(self, patients):
+        self.extend(patients)
+        return self
+
+    def insert(self, index, patient):
+        super().insert(index, patient)
+        self._reindex()
+
+    def remove(self, patient):
+        super().remove(patient)
+        self._reindex()
+
+    def pop(self, index=-1):
+        patient = super().pop(index)
+        self._reindex()
+        return patient
+
+    def clear(self):
+        super().clear()
+        self._reindex()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reindex()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.version += 1
+
+    def reverse(self):
+        super().reverse()
+        self.version += 1
+
+
+def find_patient(patient_list, patient_id):
+    """O(1) lookup on a PatientRegistry; plain lists fall back to a scan."""
+    if isinstance(patient_list, PatientRegistry):
+        return patient_list.get(patient_id)
+    return next((p for p in patient_list if p["patient_id"] == patient_id), None)
+
+
+def _db_path_for(filename):
+    return os.path.splitext(filename)[0] + DB_SUFFIX
+
+
+class PatientRepository:
+    """SQLite store holding one row per patient plus their latest vitals."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def version(self):
+        """Cheap change marker: patient count plus the newest vitals write."""
+        with self._lock:
+            row = self.conn.execute("SELECT COUNT(*), MAX(updated_at) FROM latest_vitals").fetchone()
+        return [row[0], row[1]]
+
+    def get(self, patient_id):
+        with self._lock:
+            row = self.conn.execute(SELECT_PATIENTS + " WHERE p.patient_id = ?", (patient_id,)).fetchone()
+        return coerce_patient_row(dict(row)) if row else None
+
+    def all(self):
+        with self._lock:
+            rows = self.conn.execute(SELECT_PATIENTS + " ORDER BY p.rowid").fetchall()
+        return PatientRegistry(coerce_patient_row(dict(row)) for row in rows)
+
+    def upsert(self, patient):
+        self.upsert_many([patient])
+
+    def upsert_many(self, patients):
+        now = time.time()
+        patient_rows = []
+        vitals_rows = []
+        for patient in patients:
+            patient_id = _as_text(patient.get("patient_id"))
+            patient_rows.append(
+                (patient_id, _as_text(patient.get("name")), _as_text(patient.get("DOB")), _as_text(patient.get("CC")), now)
+            )
+            vitals_rows.append(
+                (
+                    patient_id,
+                    _as_text(patient.get("HR")),
+                    _as_text(patient.get("BP")),
+                    _as_text(patient.get("Temp")),
+                    _as_text(patient.get("Diagnosis")),
+                    _as_text(patient.get("RN_AP")),
+                    _as_text(patient.get("Time")),
+                    now,
+                )
+            )
+        with self._lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO patients (patient_id, name, DOB, CC, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(patient_id) DO UPDATE SET
+                    name=excluded.name,
+                    DOB=excluded.DOB,
+                    CC=excluded.CC
+                """,
+                patient_rows,
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO latest_vitals (patient_id, HR, BP, Temp, Diagnosis, RN_AP, Time, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(patient_id) DO UPDATE SET
+                    HR=excluded.HR,
+                    BP=excluded.BP,
+                    Temp=excluded.Temp,
+                    Diagnosis=excluded.Diagnosis,
+                    RN_AP=excluded.RN_AP,
+                    Time=excluded.Time,
+                    updated_at=excluded.updated_at
+                """,
+                vitals_rows,
+            )
+
+    def delete(self, patient_id):
+        with self._lock, self.conn:
+            cur = self.conn.execute("DELETE FROM patients WHERE patient_id = ?", (patient_id,))
+        return cur.rowcount > 0
+
+    def import_csv(self, filename):
+        """Add patients from a legacy CSV that the store does not have yet.
+
+        Rows later in the file win among themselves, but never over the store:
+        vitals recorded since the import live only in the database.
+        """
+        if not os.path.isfile(filename):
+            return 0
+        stat = os.stat(filename)
+        with self._lock:
+            seen = self.conn.execute(
+                "SELECT mtime_ns, size FROM imports WHERE source = ?", (os.path.abspath(filename),)
+            ).fetchone()
+            if seen and (seen["mtime_ns"], seen["size"]) == (stat.st_mtime_ns, stat.st_size):
+                return 0
+            latest, _ = _split_versions(_read_csv(filename))
+            known = {row[0] for row in self.conn.execute("SELECT patient_id FROM patients")}
+            added = [row for patient_id, row in latest.items() if _as_text(patient_id) not in known]
+            self.upsert_many(added)
+            self.mark_imported(filename)
+        return len(added)
+
+    def mark_imported(self, filename):
+        stat = os.stat(filename)
+        with self._lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO imports (source, mtime_ns, size) VALUES (?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET mtime_ns=excluded.mtime_ns, size=excluded.size
+                """,
+                (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size),
+            )
+
+
+_REPOSITORIES = {}
+_REPOSITORIES_LOCK = threading.Lock()
+
+
+def get_repository(filename: str = CSV_FILE):
+    path = os.path.abspath(_db_path_for(filename))
+    with _REPOSITORIES_LOCK:
+        repo = _REPOSITORIES.get(path)
+        if repo is None:
+            repo = _REPOSITORIES[path] = PatientRepository(path)
+    return repo
 
 
 def load_from_csv(filename: str = CSV_FILE):
-    patient_list = []
-    if os.path.isfile(filename):
-        with open(filename, mode="r", newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                hr_value = row.get("HR")
-                temp_value = row.get("Temp")
-                try:
-                    row["HR"] = int(hr_value) if hr_value not in (None, "") else 0
-                except ValueError:
-                    row["HR"] = 0
-                try:
-                    row["Temp"] = float(temp_value) if temp_value not in (None, "") else 0.0
-                except ValueError:
-                    row["Temp"] = 0.0
-                row["Time"] = row.get("Time") or row.get("timestamp") or ""
-                patient_list.append(row)
-    return patient_list
+    repo = get_repository(filename)
+    repo.import_csv(filename)
+    return repo.all()
+
+
+def store_version(filename: str = CSV_FILE):
+    repo = get_repository(filename)
+    try:
+        stat = os.stat(filename)
+        csv_state = [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        csv_state = None
+    return [csv_state] + repo.version()
 
 
 def append_to_csv(patient, filename: str = CSV_FILE):
-    file_exists = os.path.isfile(filename)
-    with open(filename, "a", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=CSV_HEADERS)
-        if not file_exists:
-            writer.writeheader()
-        row = {field: patient.get(field, "") for field in CSV_HEADERS}
-        writer.writerow(row)
+    get_repository(filename).upsert(patient)
 
 
 def save_to_json(patient_list, filename: str = JSON_FILE):
-    with open(filename, "a") as f:
-        json.dump(patient_list, f, indent=4)
+    patients = [patient_list] if isinstance(patient_list, (dict, Patient)) else patient_list
+    get_repository(filename).upsert_many(patients)
 
 
 def save_data(patient_list, filename: str = JSON_FILE):
-    with open(filename, "w") as f:
-        json.dump(patient_list, f, indent=4)
+    get_repository(filename).upsert_many(patient_list)
 
 
 def load_data(filename: str = JSON_FILE):
-    try:
-        with open(filename, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    repo = get_repository(filename)
+    if repo.count() == 0 and os.path.isfile(filename):
+        try:
+            with open(filename, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            data = []
+        repo.upsert_many([data] if isinstance(data, dict) else data)
+    return repo.all()
+
+
+def _csv_values(row):
+    return [_as_text(row.get(field)) for field in CSV_HEADERS]
+
+
+def _write_csv_rows(rows, filename, mode):
+    file_exists = os.path.isfile(filename) and mode == "a"
+    with open(filename, mode, newline="") as file:
+        writer = csv.writer(file)
+        if not file_exists:
+            writer.writerow(CSV_HEADERS)
+        writer.writerows(_csv_values(row) for row in rows)
+
+
+def compact_csv(filename: str = CSV_FILE, history_filename: str = CSV_HISTORY_FILE):
+    """Rewrite the CSV to one current row per patient and move older rows to history."""
+    repo = get_repository(filename)
+    repo.import_csv(filename)
+    current = repo.all()
+    if not os.path.isfile(filename):
+        return 0, 0
+
+    latest, superseded = _split_versions(_read_csv(filename))
+    current_values = {row["patient_id"]: _csv_values(row) for row in current}
+    for patient_id, row in latest.items():
+        if _csv_values(coerce_patient_row(dict(row))) != current_values.get(patient_id):
+            superseded.append(row)
+
+    if superseded:
+        _write_csv_rows(superseded, history_filename, "a")
+    tmp_path = filename + ".tmp"
+    _write_csv_rows(current, tmp_path, "w")
+    os.replace(tmp_path, filename)
+    repo.mark_imported(filename)
+    return len(current), len(superseded)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Smart Record patient store maintenance")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("--csv", default=CSV_FILE)
+    parser.add_argument("--history", default=CSV_HISTORY_FILE)
+    args = parser.parse_args()
+    kept, moved = compact_csv(args.csv, args.history)
+    print(f"Compacted {args.csv}: {kept} current rows kept, {moved} older rows moved to {args.history}")
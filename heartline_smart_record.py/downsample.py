@@ -0,0 +1,116 @@
+import bisect
+
+from utils import optional_numpy
+
+# LTTB makes a few NumPy calls per bucket; with fewer points than this per bucket a plain loop is faster.
+LTTB_NUMPY_POINTS_PER_BUCKET = 32
+
+
+def visible(x, low, high):
+    """(first, stop) slice bounds of sorted x within [low, high], plus one point each side.
+
+    The extra points let lines run to the edge of the view instead of stopping
+    at the last point inside it.
+    """
+    np = optional_numpy()
+    if np is not None and hasattr(x, "dtype"):
+        first, stop = int(np.searchsorted(x, low, "left")), int(np.searchsorted(x, high, "right"))
+    else:
+        first, stop = bisect.bisect_left(x, low), bisect.bisect_right(x, high)
+    return max(0, first - 1), min(len(x), stop + 1)
+
+
+def _bucket_ids(x, buckets):
+    np = optional_numpy()
+    n = len(x)
+    span = x[-1] - x[0]
+    if np is not None:
+        if span > 0:
+            # Equal-time buckets: one per pixel column however unevenly the readings are spaced.
+            return np.minimum(((x - x[0]) * (buckets / span)).astype(np.intp), buckets - 1)
+        return np.arange(n) * buckets // n
+    if span > 0:
+        scale = buckets / span
+        return [min(int((value - x[0]) * scale), buckets - 1) for value in x]
+    return [index * buckets // n for index in range(n)]
+
+
+def minmax(x, y, buckets):
+    """Keep the lowest and highest point of each of `buckets` time buckets, in time order.
+
+    x must be sorted. The first and last points always stay, so at most
+    2 * buckets + 2 come back, and no spike is ever dropped. Of tied values
+    the earliest is kept.
+    """
+    n = len(x)
+    if buckets < 1 or n <= 2 * buckets:
+        return x, y
+    np = optional_numpy()
+    if np is not None:
+        x, y = np.asarray(x), np.asarray(y)
+        ids = _bucket_ids(x, buckets)
+        # Sorted by bucket, then by value, then (the sort is stable) by index:
+        # each bucket's run starts at its earliest min and ends at its latest max.
+        order = np.lexsort((y, ids))
+        bucket_starts = np.diff(ids[order], prepend=-1) != 0
+        starts = np.flatnonzero(bucket_starts)
+        ends = np.append(starts[1:], n) - 1
+        # Step back to the first of the tied maxima, the one the loop below keeps.
+        sorted_y = y[order]
+        ties = np.flatnonzero(bucket_starts | (np.diff(sorted_y, prepend=sorted_y[:1]) != 0))
+        highs = ties[np.searchsorted(ties, ends, "right") - 1]
+        keep = np.unique(np.concatenate((order[starts], order[highs], [0, n - 1])))
+        return x[keep], y[keep]
+    lows, highs = {}, {}
+    for index, (bucket, value) in enumerate(zip(_bucket_ids(x, buckets), y)):
+        if bucket not in lows:
+            lows[bucket] = highs[bucket] = index
+        elif value < y[lows[bucket]]:
+            lows[bucket] = index
+        elif value > y[highs[bucket]]:
+            highs[bucket] = index
+    keep = sorted(set(lows.values()) | set(highs.values()) | {0, n - 1})
+    return [x[index] for index in keep], [y[index] for index in keep]
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` points that keep the line's visual shape.
+
+    The first and last points always stay; from each bucket in between it
+    keeps the point making the largest triangle with the previous pick and
+    the average of the next bucket.
+    """
+    n = len(x)
+    if threshold < 3 or n <= threshold:
+        return x, y
+    np = optional_numpy()
+    if np is not None and n < LTTB_NUMPY_POINTS_PER_BUCKET * threshold:
+        np = None
+        x = x.tolist() if hasattr(x, "tolist") else x
+        y = y.tolist() if hasattr(y, "tolist") else y
+    every = (n - 2) / (threshold - 2)
+    keep = [0]
+    previous = 0
+    if np is not None:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        stop = int((bucket + 1) * every) + 1
+        next_stop = min(int((bucket + 2) * every) + 1, n)
+        ax, ay = x[previous], y[previous]
+        if np is not None:
+            cx, cy = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+            areas = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+            previous = start + int(areas.argmax())
+        else:
+            count = next_stop - stop
+            cx, cy = sum(x[stop:next_stop]) / count, sum(y[stop:next_stop]) / count
+            previous = max(range(start, stop), key=lambda i: abs((ax - cx) * (y[i] - ay) - (ax - x[i]) * (cy - ay)))
+        keep.append(previous)
+    keep.append(n - 1)
+    if np is not None:
+        return x[keep], y[keep]
+    return [x[index] for index in keep], [y[index] for index in keep]
+
+
+METHODS = {"minmax": minmax, "lttb": lttb}
@@ -3,45 +3,44 @@ import os
 import tkinter as tk
 from tkinter import messagebox, simpledialog, StringVar, PhotoImage, filedialog
 
-try:
-    from PIL import Image, ImageDraw, ImageTk
-except ImportError:
-    Image = None
-    ImageDraw = None
-    ImageTk = None
-
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
 
 from patient_ops import (
     add_patient,
     create_handoff_summary,
-    export_report,
     plot_abnormal_overview,
-    plot_trend,
     update_vitals,
-    priority_alerts,
+    write_report,
 )
-from tasks import add_task, delete_task, load_tasks, save_tasks, tasks_for_patient, toggle_task
-from timeline import recent_events
+import alert_rules
+import charts
+from data_access import find_patient
+from tasks import add_task, delete_task, load_tasks, priority_counts, save_tasks, tasks_for_patient, toggle_task
+from timeline import events_for_patient, recent_events
 from soft_needs import add_soft_note, get_soft_notes, save_soft_needs
 from patient_files import (
-    load_patient_files,
-    save_patient_files,
     ensure_patient_record,
+    load_thumbnail,
     update_goals,
     set_discharge_status,
     set_photo,
 )
-from medications import load_medications, save_medications, add_medication, toggle_med
-from team_chat import load_messages, add_message
+from medications import save_medications, add_medication, toggle_med
+from team_chat import add_message
 from sqlite_cache import snapshot_patients
+from app_stores import LazyStores
+import persistence
+import search_index
+from tree_views import TreeBinder, VirtualTable
+import workers
 
 BASE_DIR = os.path.dirname(__file__)
 THEME_CONFIG_PATH = os.path.join(BASE_DIR, "dashboard_theme.json")
 NOT_FOUND_LOGO = os.path.join(BASE_DIR, "app", "static", "not_found_logo.png")
 APP_LOGO = os.path.join(BASE_DIR, "app", "static", "heartline_icon.png")
+SEARCH_DEBOUNCE_MS = 150
+SUGGESTION_LIMIT = 8
 
 DASHBOARD_THEMES = {
     "Pastel Blush": {
@@ -178,6 +177,19 @@ BUTTON_STYLE_NAMES = {
 
 _NOT_FOUND_LOGO_IMAGE = None
 _APP_LOGO_IMAGE = None
+_PIL = None
+
+
+def _pil():
+    """(Image, ImageTk) from Pillow, imported when the first photo is drawn; (None, None) without it."""
+    global _PIL
+    if _PIL is None:
+        try:
+            from PIL import Image, ImageTk
+        except ImportError:
+            Image = ImageTk = None
+        _PIL = (Image, ImageTk)
+    return _PIL
 
 
 def get_not_found_logo_image():
@@ -194,6 +206,7 @@ def get_app_logo_image():
     global _APP_LOGO_IMAGE
     if _APP_LOGO_IMAGE is None and os.path.exists(APP_LOGO):
         try:
+            Image, ImageTk = _pil()
             if Image and ImageTk:
                 with Image.open(APP_LOGO) as img:
                     img.thumbnail((100, 100), Image.LANCZOS)
@@ -432,6 +445,27 @@ def gui_add_patient(patient_list, timeline_entries=None):
     ).pack(fill="x")
 
 
+def add_jump_box(parent, table, label, find=None):
+    """An entry under a VirtualTable that scrolls to and selects the row with the typed key.
+
+    find(text) may return the row index to show instead of looking the text up as a key.
+    """
+    row = ttk.Frame(parent, style=STYLE_NAMES["home"])
+    row.pack(fill="x", pady=(8, 0))
+    ttk.Label(row, text=label, style=STYLE_NAMES["tab_body"]).pack(side="left", padx=(0, 8))
+    key_var = StringVar()
+    entry = ttk.Entry(row, textvariable=key_var, width=16)
+    entry.pack(side="left")
+
+    def jump(_event=None):
+        key = key_var.get().strip()
+        if key and not (table.jump_to(key) if find is None else table.show_index(find(key))):
+            messagebox.showinfo("Not Found", f"No row for '{key}' in this list.")
+
+    entry.bind("<Return>", jump)
+    ttk.Button(row, text="Go", command=jump, style=BUTTON_STYLE_NAMES["secondary"]).pack(side="left", padx=6)
+
+
 def gui_view_patients(patient_list):
     if not patient_list:
         show_not_found_popup("No Patients Yet", "Once you add patients, they will appear in this pastel roster.")
@@ -456,37 +490,23 @@ def gui_view_patients(patient_list):
     ).pack(anchor="w", pady=(0, 16))
 
     columns = ("ID", "Name", "DOB", "HR", "BP", "Temp", "CC", "Diagnosis")
-    table_frame = ttk.Frame(container, style=STYLE_NAMES["home"])
-    table_frame.pack(fill="both", expand=True)
-
-    tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=12)
+    table = VirtualTable(
+        container,
+        columns,
+        patient_list,
+        lambda p: (p["patient_id"], p["name"], p["DOB"], p["HR"], p["BP"], p["Temp"], p.get("CC", ""), p.get("Diagnosis", "")),
+        key=lambda p: p["patient_id"],
+        height=12,
+        style=STYLE_NAMES["home"],
+    )
     for col in columns:
-        tree.heading(col, text=col)
+        table.tree.heading(col, text=col)
         width = 80 if col in ("ID", "HR", "Temp") else 110
         if col in ("CC", "Diagnosis"):
             width = 150
-        tree.column(col, width=width, anchor="center")
-
-    for p in patient_list:
-        tree.insert(
-            "",
-            "end",
-            values=(
-                p["patient_id"],
-                p["name"],
-                p["DOB"],
-                p["HR"],
-                p["BP"],
-                p["Temp"],
-                p.get("CC", ""),
-                p.get("Diagnosis", ""),
-            ),
-        )
-
-    y_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-    tree.configure(yscrollcommand=y_scroll.set)
-    tree.pack(side="left", fill="both", expand=True)
-    y_scroll.pack(side="right", fill="y")
+        table.tree.column(col, width=width, anchor="center")
+    table.pack(fill="both", expand=True)
+    add_jump_box(container, table, "Jump to patient ID")
 
     ttk.Button(container, text="Close", command=window.destroy, style=BUTTON_STYLE_NAMES["secondary"]).pack(
         pady=14, ipadx=10
@@ -497,39 +517,32 @@ def gui_search_patients(patient_list):
     search_id = simpledialog.askstring("Search", "Enter Patient ID: ")
     if not search_id:
         return
-    for p in patient_list:
-        if p["patient_id"] == search_id:
-            info = f"{p['patient_id']} | {p['name']} | {p['DOB']}"
-            messagebox.showinfo("Patient Found", info)
-            return
+    p = find_patient(patient_list, search_id)
+    if p:
+        info = f"{p['patient_id']} | {p['name']} | {p['DOB']}"
+        messagebox.showinfo("Patient Found", info)
+        return
     show_not_found_popup("Patient Not Found", "We couldn't find that patient ID. Double-check the digits or add a new record.")
 
 
-def gui_abnormal_summary(patient_list):
+def gui_abnormal_summary(patient_list, rules=None):
     if not patient_list:
         messagebox.showinfo("Info", "No patient record found, Try Again!")
         return
 
     summary = ""
-    abnormal_bp_count = 0
-    abnormal_hr_count = 0
-
-    for p in patient_list:
-        systolic, diastolic = map(int, p["BP"].split("/"))
-        HR = int(p["HR"])
-
-        abnormal_bp = systolic < 90 or systolic > 140 or diastolic < 50 or diastolic > 100
-        abnormal_hr = HR > 100 or HR < 50
-
-        if abnormal_bp:
-            abnormal_bp_count += 1
-        if abnormal_hr:
-            abnormal_hr_count += 1
-
-        if abnormal_bp or abnormal_hr:
-            summary += f"{p['patient_id']} | {p['name']}"
-            summary += f" BP: {p['BP']} {'⚠️ ' if abnormal_bp else ''}"
-            summary += f" HR: {p['HR']} {'⚠️ ' if abnormal_hr else ''}\n"
+    assessment = alert_rules.assess(patient_list, rules)
+    abnormal_bp_count = assessment.count("BP")
+    abnormal_hr_count = assessment.count("HR")
+
+    for index, p in enumerate(assessment.patients):
+        abnormal_bp = assessment.flagged(index, "BP")
+        abnormal_hr = assessment.flagged(index, "HR")
+        if not (abnormal_bp or abnormal_hr):
+            continue
+        summary += f"{p['patient_id']} | {p['name']}"
+        summary += f" BP: {p['BP']} {'⚠️ ' if abnormal_bp else ''}"
+        summary += f" HR: {p['HR']} {'⚠️ ' if abnormal_hr else ''}\n"
 
     if not summary:
         summary = "All patients vitals are normal!!"
@@ -542,7 +555,7 @@ def gui_update_vitals(patient_list, timeline_entries=None):
     update_id = simpledialog.askstring("Update Vitals", "Patient ID to update:")
     if not update_id:
         return
-    patient = next((p for p in patient_list if p["patient_id"] == update_id), None)
+    patient = find_patient(patient_list, update_id)
     if not patient:
         show_not_found_popup("Not Found", "No patient matches that ID.")
         return
@@ -589,8 +602,34 @@ def gui_update_vitals(patient_list, timeline_entries=None):
 
 def gui_plot_trend(patient_list):
     patient_id = simpledialog.askstring("Input", "Enter Patient ID for Chart")
-    if patient_id:
-        plot_trend(patient_list, patient_id)
+    if not patient_id:
+        return
+    patient = find_patient(patient_list, patient_id)
+    if not patient:
+        messagebox.showerror("Error!", "Patient not found, Try Again!")
+        return
+    cached = charts.cached_trend(patient_id)
+    if cached is not None:
+        charts.show_trend(patient_id, *cached)
+        return
+    # Reading the history file happens on a worker; the chart opens back on the Tk thread.
+    workers.submit(
+        "Loading vitals history",
+        charts.load_trend,
+        patient,
+        done=lambda trend: charts.show_trend(patient_id, *trend),
+    )
+
+
+def gui_export_report(patient_list, filename="report"):
+    workers.submit(
+        "Exporting report",
+        write_report,
+        patient_list,
+        filename,
+        progress=True,
+        done=lambda path: messagebox.showinfo("Export", f"Report saved as {path}"),
+    )
 
 
 def gui_scan_barcode(patient_list):
@@ -598,7 +637,7 @@ def gui_scan_barcode(patient_list):
     if not scanned:
         return
     scanned = scanned.strip()
-    patient = next((p for p in patient_list if p["patient_id"] == scanned), None)
+    patient = find_patient(patient_list, scanned)
     if patient:
         info = (
             f"{patient['patient_id']} • {patient['name']}\n"
@@ -610,6 +649,16 @@ def gui_scan_barcode(patient_list):
         show_not_found_popup("Not Found", "No patient matches that barcode/ID. Try scanning again.")
 
 
+def gui_snapshot(patient_list, stores=None):
+    def saved(result):
+        messagebox.showinfo(
+            "Snapshot Saved",
+            f"Cached {result.rows_written} changed patient(s) in {result.elapsed_ms:.0f} ms.",
+        )
+
+    workers.submit("Saving snapshot", snapshot_patients, patient_list, stores, done=saved)
+
+
 def show_handoff_summary_popup(patient_list, tasks):
     summary = create_handoff_summary(patient_list, tasks)
     window = ttk.Toplevel()
@@ -637,39 +686,38 @@ def open_task_center(patient_list, tasks):
     container = ttk.Frame(window, padding=16, style=STYLE_NAMES["home"])
     container.pack(fill="both", expand=True)
 
+    def resolve_name(patient_id):
+        patient = find_patient(patient_list, patient_id)
+        return f"{patient_id} - {patient['name']}" if patient else patient_id
+
     columns = ("id", "patient", "priority", "description", "due", "status")
-    tree = ttk.Treeview(container, columns=columns, show="headings", height=12)
+    table = VirtualTable(
+        container,
+        columns,
+        tasks,
+        lambda task: (
+            task["id"],
+            resolve_name(task["patient_id"]),
+            task.get("priority", "do soon"),
+            task["description"],
+            task.get("due", ""),
+            task.get("status", "pending"),
+        ),
+        key=lambda task: task["id"],
+        height=12,
+        style=STYLE_NAMES["home"],
+    )
     for col in columns:
         width = 80 if col == "id" else 140
-        tree.heading(col, text=col.title())
-        tree.column(col, width=width, anchor="center")
-    tree.pack(fill="both", expand=True, pady=(0, 12))
-
-    def resolve_name(patient_id):
-        patient = next((p for p in patient_list if p["patient_id"] == patient_id), None)
-        return f"{patient_id} - {patient['name']}" if patient else patient_id
+        table.tree.heading(col, text=col.title())
+        table.tree.column(col, width=width, anchor="center")
+    table.pack(fill="both", expand=True, pady=(0, 12))
 
     summary_var = StringVar()
 
     def refresh_tree():
-        for row in tree.get_children():
-            tree.delete(row)
-        for task in tasks:
-            tree.insert(
-                "",
-                "end",
-                values=(
-                    task["id"],
-                    resolve_name(task["patient_id"]),
-                    task.get("priority", "do soon"),
-                    task["description"],
-                    task.get("due", ""),
-                    task.get("status", "pending"),
-                ),
-            )
-        counts = {"do now": 0, "do soon": 0, "can wait": 0}
-        for task in tasks:
-            counts[task.get("priority", "do soon")] = counts.get(task.get("priority", "do soon"), 0) + 1
+        table.refresh()
+        counts = priority_counts(tasks)
         summary_var.set(
             f"Do now: {counts.get('do now',0)}  •  Do soon: {counts.get('do soon',0)}  •  Can wait: {counts.get('can wait',0)}"
         )
@@ -707,7 +755,7 @@ def open_task_center(patient_list, tasks):
         if not patient_id or not description:
             messagebox.showerror("Missing data", "Please enter both patient ID and description.")
             return
-        if not any(p["patient_id"] == patient_id for p in patient_list):
+        if not find_patient(patient_list, patient_id):
             messagebox.showerror("Unknown Patient", "That patient ID does not exist yet.")
             return
         add_task(tasks, patient_id, description, due_var.get().strip(), priority_var.get())
@@ -718,19 +766,17 @@ def open_task_center(patient_list, tasks):
         priority_var.set("do soon")
 
     def toggle_selected():
-        selection = tree.selection()
-        if not selection:
+        task = table.selected_row()
+        if task is None:
             return
-        task_id = tree.item(selection[0], "values")[0]
-        toggle_task(tasks, task_id)
+        toggle_task(tasks, task["id"])
         refresh_tree()
 
     def delete_selected():
-        selection = tree.selection()
-        if not selection:
+        task = table.selected_row()
+        if task is None:
             return
-        task_id = tree.item(selection[0], "values")[0]
-        delete_task(tasks, task_id)
+        delete_task(tasks, task["id"])
         refresh_tree()
 
     button_frame = ttk.Frame(container, style=STYLE_NAMES["home"])
@@ -756,32 +802,39 @@ def open_timeline_view(timeline_entries, patient_list):
     container = ttk.Frame(window, padding=16, style=STYLE_NAMES["home"])
     container.pack(fill="both", expand=True)
 
-    columns = ("timestamp", "patient", "event", "description")
-    tree = ttk.Treeview(container, columns=columns, show="headings", height=18)
-    for col in columns:
-        width = 120 if col != "description" else 280
-        tree.heading(col, text=col.title())
-        tree.column(col, width=width, anchor="center")
-    tree.pack(fill="both", expand=True)
-
     def resolve_name(pid):
-        patient = next((p for p in patient_list if p["patient_id"] == pid), None)
+        patient = find_patient(patient_list, pid)
         return f"{pid} - {patient['name']}" if patient else pid
 
-    for entry in recent_events(timeline_entries):
-        tree.insert(
-            "",
-            "end",
-            values=(entry["timestamp"], resolve_name(entry["patient_id"]), entry["event"], entry["description"]),
-        )
+    def latest_event(pid):
+        return next((index for index, entry in enumerate(events) if entry["patient_id"] == pid), None)
+
+    # The whole timeline, newest first; only the visible lines become Tk items. The list is a
+    # fixed snapshot, so rows are keyed by position: timestamps are per minute and can repeat.
+    events = recent_events(timeline_entries, len(timeline_entries))
+    columns = ("timestamp", "patient", "event", "description")
+    table = VirtualTable(
+        container,
+        columns,
+        events,
+        lambda entry: (entry["timestamp"], resolve_name(entry["patient_id"]), entry["event"], entry["description"]),
+        height=18,
+        style=STYLE_NAMES["home"],
+    )
+    for col in columns:
+        width = 120 if col != "description" else 280
+        table.tree.heading(col, text=col.title())
+        table.tree.column(col, width=width, anchor="center")
+    table.pack(fill="both", expand=True)
+    add_jump_box(container, table, "Jump to patient's latest event", find=latest_event)
 
     ttk.Button(container, text="Close", command=window.destroy, style=BUTTON_STYLE_NAMES["secondary"]).pack(pady=10)
 
 
-def open_search_center(patient_list, tasks, timeline_entries, query):
+def open_search_center(patient_list, tasks, timeline_entries, query, soft_notes=None, medications=None, messages=()):
     if not query:
         return
-    query_lower = query.lower()
+    index = search_index.ensure_index(patient_list, tasks, timeline_entries, soft_notes, medications, messages)
     window = ttk.Toplevel()
     window.title(f"Search Results for '{query}'")
     window.geometry("760x540")
@@ -798,20 +851,8 @@ def open_search_center(patient_list, tasks, timeline_entries, query):
         tree.column(col, width=width, anchor="w")
     tree.pack(fill="both", expand=True)
 
-    def match(text):
-        return query_lower in str(text).lower()
-
-    for p in patient_list:
-        if match(p["patient_id"]) or match(p["name"]) or match(p.get("Diagnosis", "")) or match(p.get("CC", "")):
-            tree.insert("", "end", values=("Patient", f"{p['patient_id']} - {p['name']}", p.get("Diagnosis", "")))
-
-    for task in tasks:
-        if match(task["description"]) or match(task["patient_id"]):
-            tree.insert("", "end", values=("Task", task["patient_id"], task["description"]))
-
-    for entry in timeline_entries:
-        if match(entry["description"]) or match(entry["patient_id"]):
-            tree.insert("", "end", values=("Timeline", entry["patient_id"], entry["description"]))
+    for result in index.search(query, limit=200):
+        tree.insert("", "end", values=(result.kind, result.label, result.details))
 
     ttk.Button(container, text="Close", command=window.destroy, style=BUTTON_STYLE_NAMES["secondary"]).pack(pady=10)
 
@@ -871,14 +912,19 @@ def open_soft_needs_center(patient_list, soft_notes):
         tree.column(col, width=width, anchor="w")
     tree.pack(fill="both", expand=True, pady=(0, 12))
 
-    def refresh():
-        for row in tree.get_children():
-            tree.delete(row)
+    binder = TreeBinder(tree)
+
+    def note_rows():
+        # Notes are append-only, so (patient, position) names a row for good.
         for pid, entries in soft_notes.items():
-            patient = next((p for p in patient_list if p["patient_id"] == pid), None)
+            patient = find_patient(patient_list, pid)
             prefix = f"{pid} - {patient['name']}" if patient else pid
-            for entry in entries[-5:]:
-                tree.insert("", "end", values=(prefix, f"{entry['timestamp']}: {entry['note']}"))
+            for index in range(max(0, len(entries) - 5), len(entries)):
+                entry = entries[index]
+                yield f"{pid}:{index}", (prefix, f"{entry['timestamp']}: {entry['note']}")
+
+    def refresh():
+        binder.sync(note_rows())
 
     form = ttk.Frame(container, style=STYLE_NAMES["home"])
     form.pack(fill="x")
@@ -911,7 +957,7 @@ def open_med_tracker(patient_list, medications):
     pid = simpledialog.askstring("Med Tracker", "Enter Patient ID:")
     if not pid:
         return
-    patient = next((p for p in patient_list if p["patient_id"] == pid), None)
+    patient = find_patient(patient_list, pid)
     if not patient:
         show_not_found_popup("Not Found", "No patient matches that ID.")
         return
@@ -932,22 +978,19 @@ def open_med_tracker(patient_list, medications):
         tree.column(col, anchor="center", width=120)
     tree.pack(fill="both", expand=True)
 
+    binder = TreeBinder(tree)
+
+    def med_values(med):
+        return (
+            med["name"],
+            med["dose"],
+            med["schedule"],
+            med.get("priority", "do soon"),
+            "Given" if med.get("given") else "Pending",
+        )
+
     def refresh_tree():
-        for row in tree.get_children():
-            tree.delete(row)
-        for idx, med in enumerate(meds):
-            tree.insert(
-                "",
-                "end",
-                iid=str(idx),
-                values=(
-                    med["name"],
-                    med["dose"],
-                    med["schedule"],
-                    med.get("priority", "do soon"),
-                    "Given" if med.get("given") else "Pending",
-                ),
-            )
+        binder.sync((idx, med_values(med)) for idx, med in enumerate(meds))
 
     def add_med():
         name = simpledialog.askstring("Medication", "Name:")
@@ -964,8 +1007,9 @@ def open_med_tracker(patient_list, medications):
         if not selection:
             return
         idx = int(selection[0])
-        toggle_med(medications, pid, idx)
-        refresh_tree()
+        med = toggle_med(medications, pid, idx)
+        if med is not None:
+            binder.patch(idx, med_values(med))
 
     btn_frame = ttk.Frame(container, style=STYLE_NAMES["home"])
     btn_frame.pack(fill="x", pady=6)
@@ -993,11 +1037,15 @@ def open_team_comm(team_messages, role_var):
         tree.column(col, width=width, anchor="w")
     tree.pack(fill="both", expand=True, pady=(0, 10))
 
+    binder = TreeBinder(tree)
+
     def refresh():
-        for row in tree.get_children():
-            tree.delete(row)
-        for msg in team_messages[-100:]:
-            tree.insert("", "end", values=(msg["timestamp"], msg["author"], msg["role"], msg["text"]))
+        # Chat is append-only: a message's position in team_messages is its key.
+        start = max(0, len(team_messages) - 100)
+        binder.sync(
+            (index, (msg["timestamp"], msg["author"], msg["role"], msg["text"]))
+            for index, msg in enumerate(team_messages[start:], start)
+        )
 
     entry_frame = ttk.Frame(container, style=STYLE_NAMES["home"])
     entry_frame.pack(fill="x")
@@ -1022,50 +1070,7 @@ def open_team_comm(team_messages, role_var):
 
 
 def open_universal_chart(patient_list):
-    import matplotlib.pyplot as plt
-    if not patient_list:
-        messagebox.showinfo("Info", "No patient data to chart.")
-        return
-    try:
-        import numpy as np
-    except ImportError:
-        np = None
-    patients = []
-    hr = []
-    systolic = []
-    diastolic = []
-    for p in patient_list:
-        try:
-            s, d = map(int, p["BP"].split("/"))
-            patients.append(p["name"])
-            hr.append(int(p["HR"]))
-            systolic.append(s)
-            diastolic.append(d)
-        except Exception:
-            continue
-    if not patients:
-        messagebox.showinfo("Info", "Vitals missing for chart.")
-        return
-    x = range(len(patients))
-    plt.figure(figsize=(9, 4))
-    plt.plot(x, hr, marker="o", label="HR")
-    plt.plot(x, systolic, marker="s", label="Systolic")
-    plt.plot(x, diastolic, marker="^", label="Diastolic")
-    plt.xticks(x, patients, rotation=45, ha="right")
-    plt.ylabel("Value")
-    plt.title("Universal Vitals Chart — Quick Care Pointers")
-    care_notes = "\n".join(
-        [
-            "How to use:",
-            "• Hover over spikes for coaching opportunities.",
-            "• Sync with SBAR cards before handoff.",
-            "• Review HR/BP trends to prioritize rounding order.",
-        ]
-    )
-    plt.figtext(0.01, -0.05, care_notes, ha="left", fontsize=9)
-    plt.tight_layout()
-    plt.legend()
-    plt.show()
+    charts.show_universal(patient_list)
 
 
 def open_downtime_screen(role_var):
@@ -1114,20 +1119,29 @@ def open_patient_file(patient, tasks, timeline_entries, soft_notes, patient_file
         if not path:
             return
         set_photo(patient_files, patient["patient_id"], path)
-        save_patient_files(patient_files)
         record["photo"] = path
         display_photo()
 
+    def show_thumbnail(thumbnail):
+        if not photo_canvas.winfo_exists():
+            return
+        Image, ImageTk = _pil() if thumbnail else (None, None)
+        if Image and ImageTk:
+            mode, size, pixels = thumbnail
+            photo = ImageTk.PhotoImage(Image.frombytes(mode, size, pixels))
+            photo_canvas.configure(image=photo, text="")
+            photo_canvas.image = photo
+        else:
+            photo_canvas.configure(text="No Photo", image="", width=20, height=10)
+
     def display_photo():
         path = record.get("photo")
-        if path and os.path.isfile(path) and Image and ImageTk:
-            with Image.open(path) as img:
-                img.thumbnail((200, 200))
-                photo = ImageTk.PhotoImage(img.copy())
-                photo_canvas.configure(image=photo)
-                photo_canvas.image = photo
+        if path and os.path.isfile(path) and _pil()[0]:
+            # Decoding and shrinking a camera-sized photo is CPU work; do it in a worker process.
+            photo_canvas.configure(text="Loading…", image="")
+            workers.submit("Loading photo", load_thumbnail, path, cpu=True, done=show_thumbnail)
         else:
-            photo_canvas.configure(text="No Photo", image="", width=20, height=10)
+            show_thumbnail(None)
 
     ttk.Button(photo_frame, text="Upload Photo", command=load_photo, style=BUTTON_STYLE_NAMES["secondary"]).pack(pady=8)
     display_photo()
@@ -1162,7 +1176,6 @@ def open_patient_file(patient, tasks, timeline_entries, soft_notes, patient_file
         goals = [line.strip() for line in goals_text.get("1.0", "end").splitlines() if line.strip()]
         update_goals(patient_files, patient["patient_id"], goals, assigned_var.get())
         set_discharge_status(patient_files, patient["patient_id"], discharge_var.get())
-        save_patient_files(patient_files)
         messagebox.showinfo("Saved", "Patient goals updated.")
 
     ttk.Button(goals_frame, text="Save Goals", command=save_goals, style=BUTTON_STYLE_NAMES["success"]).pack(anchor="e")
@@ -1181,7 +1194,7 @@ def open_patient_file(patient, tasks, timeline_entries, soft_notes, patient_file
 
     task_tab = ttk.Frame(tabs, padding=10, style=STYLE_NAMES["home"])
     tabs.add(task_tab, text="Tasks")
-    patient_tasks = [t for t in tasks if t["patient_id"] == patient["patient_id"]]
+    patient_tasks = tasks_for_patient(tasks, patient["patient_id"])
     build_list(
         task_tab,
         [f"[{t.get('priority','do soon')}] {t['description']} ({t.get('status','pending')})" for t in patient_tasks]
@@ -1192,8 +1205,7 @@ def open_patient_file(patient, tasks, timeline_entries, soft_notes, patient_file
     tabs.add(timeline_tab, text="Timeline")
     patient_timeline = [
         f"{e['timestamp']} - {e['event']}: {e['description']}"
-        for e in timeline_entries
-        if e["patient_id"] == patient["patient_id"]
+        for e in events_for_patient(timeline_entries, patient["patient_id"])
     ]
     build_list(timeline_tab, patient_timeline or ["No timeline entries."])
 
@@ -1217,7 +1229,7 @@ def open_patient_file_prompt(patient_list, tasks, timeline_entries, soft_notes,
     pid = simpledialog.askstring("Patient File", "Enter Patient ID:")
     if not pid:
         return
-    patient = next((p for p in patient_list if p["patient_id"] == pid), None)
+    patient = find_patient(patient_list, pid)
     if not patient:
         show_not_found_popup("Not Found", "No patient matches that ID.")
         return
@@ -1232,16 +1244,24 @@ def launch_gui(
     medications=None,
     team_messages=None,
 ):
-    tasks = tasks or []
-    timeline_entries = timeline_entries or []
-    soft_notes = soft_notes or {}
-    patient_files = patient_files or load_patient_files()
-    medications = medications or load_medications()
-    team_messages = team_messages or load_messages()
+    # Stores left as None load on first use (and are prefetched after the first paint).
+    stores = LazyStores(
+        {
+            "tasks": tasks,
+            "timeline": timeline_entries,
+            "soft_notes": soft_notes,
+            "patient_files": patient_files,
+            "medications": medications,
+            "team_messages": team_messages,
+        }
+    )
     default_theme = "Pastel Blush"
     active_theme = load_saved_theme(default_theme)
     root = ttk.Window(title="✨ Smart Record App ✨", themename=DASHBOARD_THEMES[active_theme]["base_theme"])
     root.geometry("980x640")
+    persistence.SCHEDULER.attach(root)
+    workers.POOL.attach(root)
+    workers.POOL.on_error = lambda error: messagebox.showerror("Background Task Failed", str(error))
 
     style = ttk.Style()
     apply_dashboard_theme(style, root, active_theme)
@@ -1250,6 +1270,36 @@ def launch_gui(
         root.iconphoto(False, app_logo)
         root._app_logo = app_logo  # keep reference
 
+    # Busy indicator for work handed to the worker pool; hidden while idle.
+    status_bar = ttk.Frame(root, padding=(16, 0, 16, 8))
+    status_bar.pack(side="bottom", fill="x")
+    status_label = ttk.Label(status_bar, text="")
+    status_progress = ttk.Progressbar(status_bar, length=180)
+
+    def show_busy(count, label, fraction):
+        if not count:
+            status_progress.stop()
+            status_label.pack_forget()
+            status_progress.pack_forget()
+            root.configure(cursor="")
+            return
+        more = f" (+{count - 1} more)" if count > 1 else ""
+        status_label.configure(text=f"{label}…{more}")
+        if fraction is None:
+            if status_progress.cget("mode") != "indeterminate":
+                status_progress.configure(mode="indeterminate")
+                status_progress.start(15)
+        else:
+            status_progress.stop()
+            status_progress.configure(mode="determinate", value=fraction * 100)
+        if not status_label.winfo_ismapped():
+            status_label.pack(side="left")
+            status_progress.pack(side="right")
+            root.configure(cursor="watch")
+
+    workers.POOL.watch(show_busy)
+    status_bar.bind("<Destroy>", lambda _event: workers.POOL.unwatch(show_busy), add="+")
+
     notebook = ttk.Notebook(root)
     notebook.pack(expand=True, fill="both", padx=16, pady=16)
 
@@ -1283,24 +1333,101 @@ def launch_gui(
     search_var = StringVar()
     search_entry = ttk.Entry(control_row, textvariable=search_var)
     search_entry.grid(row=0, column=0, sticky="ew", padx=(0, 8))
+
+    def run_full_search():
+        open_search_center(
+            patient_list,
+            stores.tasks,
+            stores.timeline,
+            search_var.get(),
+            stores.soft_notes,
+            stores.medications,
+            stores.team_messages,
+        )
+
     ttk.Button(
         control_row,
         text="🔎 Search",
-        command=lambda: open_search_center(patient_list, tasks, timeline_entries, search_var.get()),
+        command=run_full_search,
         style=BUTTON_STYLE_NAMES["info"],
     ).grid(row=0, column=1, padx=(0, 8))
 
+    # As-you-type suggestions render under the search row instead of opening a window per query.
+    suggestion_tree = ttk.Treeview(banner, columns=("type", "match", "details"), show="headings", height=SUGGESTION_LIMIT)
+    for col, width in (("type", 90), ("match", 220), ("details", 360)):
+        suggestion_tree.heading(col, text=col.title())
+        suggestion_tree.column(col, width=width, anchor="w")
+    suggestion_results = {}
+    pending_suggestion = [None]
+
+    def show_suggestions():
+        pending_suggestion[0] = None
+        suggestion_tree.delete(*suggestion_tree.get_children())
+        suggestion_results.clear()
+        query = search_var.get().strip()
+        if not query:
+            suggestion_tree.grid_remove()
+            return
+        index = search_index.ensure_index(
+            patient_list, stores.tasks, stores.timeline, stores.soft_notes, stores.medications, stores.team_messages
+        )
+        for result in index.suggest(query, SUGGESTION_LIMIT):
+            row = suggestion_tree.insert("", "end", values=(result.kind, result.label, result.details))
+            suggestion_results[row] = result
+        if suggestion_results:
+            suggestion_tree.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+        else:
+            suggestion_tree.grid_remove()
+
+    def on_search_typed(*_):
+        if pending_suggestion[0] is not None:
+            root.after_cancel(pending_suggestion[0])
+        pending_suggestion[0] = root.after(SEARCH_DEBOUNCE_MS, show_suggestions)
+
+    def open_suggestion(event=None):
+        selected = suggestion_tree.selection()
+        if not selected:
+            run_full_search()
+            return
+        result = suggestion_results[selected[0]]
+        patient = find_patient(patient_list, result.patient_id)
+        if result.kind == "Patient" and patient:
+            open_patient_file(patient, stores.tasks, stores.timeline, stores.soft_notes, stores.patient_files)
+        elif result.kind == "Task":
+            open_task_center(patient_list, stores.tasks)
+        else:
+            run_full_search()
+
+    def focus_suggestions(event=None):
+        rows = suggestion_tree.get_children()
+        if rows:
+            suggestion_tree.focus_set()
+            suggestion_tree.selection_set(rows[0])
+            suggestion_tree.focus(rows[0])
+
+    def hide_suggestions(event=None):
+        search_var.set("")
+        suggestion_tree.grid_remove()
+
+    search_var.trace_add("write", on_search_typed)
+    search_entry.bind("<Return>", open_suggestion)
+    search_entry.bind("<Escape>", hide_suggestions)
+    search_entry.bind("<Down>", focus_suggestions)
+    suggestion_tree.bind("<Double-1>", open_suggestion)
+    suggestion_tree.bind("<Return>", open_suggestion)
+    suggestion_tree.bind("<Escape>", hide_suggestions)
+
     ttk.Button(
         control_row,
         text="🕒 Timeline",
-        command=lambda: open_timeline_view(timeline_entries, patient_list),
+        command=lambda: open_timeline_view(stores.timeline, patient_list),
         style=BUTTON_STYLE_NAMES["secondary"],
     ).grid(row=0, column=2, padx=(0, 8))
 
     ttk.Button(
         control_row,
         text="💬 Team Chat",
-        command=lambda: open_team_comm(team_messages, role_var),
+        command=lambda: open_team_comm(stores.team_messages, role_var),
         style=BUTTON_STYLE_NAMES["accent"],
     ).grid(row=0, column=3, padx=(0, 8))
 
@@ -1314,7 +1441,7 @@ def launch_gui(
     ttk.Button(
         control_row,
         text="💾 Snapshot",
-        command=lambda: snapshot_patients(patient_list),
+        command=lambda: gui_snapshot(patient_list, stores.loaded()),
         style=BUTTON_STYLE_NAMES["success"],
     ).grid(row=0, column=5, padx=(0, 8))
 
@@ -1329,12 +1456,16 @@ def launch_gui(
     )
     role_combo.grid(row=0, column=7)
 
+    def role_rules():
+        return alert_rules.rules_for(role=role_var.get())
+
     def on_role_change(_event=None):
         selection = role_var.get()
         if selection == "Tech":
             patient_panel.configure(text="Patient Actions 🛠️")
         else:
             patient_panel.configure(text="Patient Actions 🩺")
+        refresh_alerts()
 
     role_combo.bind("<<ComboboxSelected>>", on_role_change)
 
@@ -1432,7 +1563,7 @@ def launch_gui(
     create_dashboard_button(
         patient_panel,
         "➕ Add New Patient",
-        lambda: gui_add_patient(patient_list, timeline_entries),
+        lambda: gui_add_patient(patient_list, stores.timeline),
         style_role="primary",
     )
     create_dashboard_button(patient_panel, "📋 View Patients", lambda: gui_view_patients(patient_list), style_role="secondary")
@@ -1440,31 +1571,33 @@ def launch_gui(
     create_dashboard_button(
         patient_panel,
         "🗂️ Patient File",
-        lambda: open_patient_file_prompt(patient_list, tasks, timeline_entries, soft_notes, patient_files),
+        lambda: open_patient_file_prompt(
+            patient_list, stores.tasks, stores.timeline, stores.soft_notes, stores.patient_files
+        ),
         style_role="insight",
     )
     create_dashboard_button(
         patient_panel,
         "💊 Med Tracker",
-        lambda: open_med_tracker(patient_list, medications),
+        lambda: open_med_tracker(patient_list, stores.medications),
         style_role="accent",
     )
     create_dashboard_button(patient_panel, "🧾 Scan Barcode/ID", lambda: gui_scan_barcode(patient_list), style_role="accent")
 
     create_dashboard_button(
-        monitor_panel, "⚠️ Abnormal Summary", lambda: gui_abnormal_summary(patient_list), style_role="alert"
+        monitor_panel, "⚠️ Abnormal Summary", lambda: gui_abnormal_summary(patient_list, role_rules()), style_role="alert"
     )
     create_dashboard_button(
         monitor_panel,
         "🩺 Update Vitals",
-        lambda: gui_update_vitals(patient_list, timeline_entries),
+        lambda: gui_update_vitals(patient_list, stores.timeline),
         style_role="accent",
     )
     create_dashboard_button(
         monitor_panel, "📈 Vitals Trend Chart", lambda: gui_plot_trend(patient_list), style_role="insight"
     )
     create_dashboard_button(
-        monitor_panel, "📊 Abnormal Vitals Chart", lambda: plot_abnormal_overview(patient_list), style_role="info"
+        monitor_panel, "📊 Abnormal Vitals Chart", lambda: plot_abnormal_overview(patient_list, role_rules()), style_role="info"
     )
     create_dashboard_button(
         monitor_panel,
@@ -1481,26 +1614,38 @@ def launch_gui(
     alert_tree.column("details", width=240)
     alert_tree.pack(fill="both", expand=True)
 
+    severity_colors = {
+        "critical": "[CRITICAL]",
+        "warning": "[Warning]",
+        "info": "[Info]",
+    }
+
+    def apply_alert_event(event, alert):
+        # One Treeview row per patient, keyed by patient_id, patched in place.
+        iid = alert["patient_id"]
+        if event == "cleared":
+            if alert_tree.exists(iid):
+                alert_tree.delete(iid)
+            return
+        label = f"{alert['patient_id']} - {alert['name']} {severity_colors.get(alert['severity'], '')}"
+        if alert_tree.exists(iid):
+            alert_tree.item(iid, values=(label, alert["details"]))
+        else:
+            alert_tree.insert("", "end", iid=iid, values=(label, alert["details"]))
+
     def refresh_alerts():
-        for row in alert_tree.get_children():
-            alert_tree.delete(row)
-        severity_colors = {
-            "critical": "[CRITICAL]",
-            "warning": "[Warning]",
-            "info": "[Info]",
-        }
-        for alert in priority_alerts(patient_list):
-            label = f"{alert['patient_id']} - {alert['name']} {severity_colors.get(alert['severity'], '')}"
-            alert_tree.insert("", "end", values=(label, alert["details"]))
+        alert_rules.BOARD.set_rules(role_rules())
 
-    refresh_alerts()
+    alert_rules.BOARD.subscribe(apply_alert_event)
+    alert_tree.bind("<Destroy>", lambda _event: alert_rules.BOARD.unsubscribe(apply_alert_event), add="+")
+    alert_rules.BOARD.load(patient_list, role_rules())
 
     report_actions = [
-        ("📤 Export Report", lambda: export_report(patient_list), "success"),
-        ("🧾 Handoff Summary", lambda: show_handoff_summary_popup(patient_list, tasks), "info"),
-        ("✅ Task Reminders", lambda: open_task_center(patient_list, tasks), "accent"),
-        ("🪄 SBAR Cards", lambda: open_sbar_cards(patient_list, soft_notes), "info"),
-        ("🌸 Soft Needs Notes", lambda: open_soft_needs_center(patient_list, soft_notes), "secondary"),
+        ("📤 Export Report", lambda: gui_export_report(patient_list), "success"),
+        ("🧾 Handoff Summary", lambda: show_handoff_summary_popup(patient_list, stores.tasks), "info"),
+        ("✅ Task Reminders", lambda: open_task_center(patient_list, stores.tasks), "accent"),
+        ("🪄 SBAR Cards", lambda: open_sbar_cards(patient_list, stores.soft_notes), "info"),
+        ("🌸 Soft Needs Notes", lambda: open_soft_needs_center(patient_list, stores.soft_notes), "secondary"),
         ("❌ Exit", root.destroy, "danger"),
     ]
     for i in range(0, len(report_actions), 2):
@@ -1529,7 +1674,7 @@ def launch_gui(
         create_dashboard_button(
             patient_shortcuts,
             "➕ Register A New Patient",
-            lambda: gui_add_patient(patient_list, timeline_entries),
+            lambda: gui_add_patient(patient_list, stores.timeline),
             style_role="primary",
         )
         create_dashboard_button(
@@ -1554,7 +1699,7 @@ def launch_gui(
             justify="left",
         ).pack(pady=(0, 8))
         create_dashboard_button(
-            patient_notes, "⚠️ View Abnormal Summary", lambda: gui_abnormal_summary(patient_list), style_role="alert"
+            patient_notes, "⚠️ View Abnormal Summary", lambda: gui_abnormal_summary(patient_list, role_rules()), style_role="alert"
         )
         create_dashboard_button(
             patient_notes, "📈 Vitals Trend Chart", lambda: gui_plot_trend(patient_list), style_role="insight"
@@ -1579,11 +1724,11 @@ def launch_gui(
         create_dashboard_button(
             vital_snapshot,
             "🩺 Update Vitals",
-            lambda: gui_update_vitals(patient_list, timeline_entries),
+            lambda: gui_update_vitals(patient_list, stores.timeline),
             style_role="accent",
         )
         create_dashboard_button(
-            vital_snapshot, "⚠️ Review Abnormal Metrics", lambda: gui_abnormal_summary(patient_list), style_role="alert"
+            vital_snapshot, "⚠️ Review Abnormal Metrics", lambda: gui_abnormal_summary(patient_list, role_rules()), style_role="alert"
         )
 
         monitor_reports = ttk.Labelframe(
@@ -1601,7 +1746,7 @@ def launch_gui(
             justify="left",
         ).pack(pady=(0, 10))
         create_dashboard_button(
-            monitor_reports, "📤 Export Vitals Report", lambda: export_report(patient_list), style_role="success"
+            monitor_reports, "📤 Export Vitals Report", lambda: gui_export_report(patient_list), style_role="success"
         )
         create_dashboard_button(
             monitor_reports, "📋 View Patient Table", lambda: gui_view_patients(patient_list), style_role="secondary"
@@ -1624,12 +1769,12 @@ def launch_gui(
             justify="left",
         ).pack(pady=(0, 12))
         create_dashboard_button(
-            export_guides, "📄 Export Patient CSV", lambda: export_report(patient_list), style_role="success"
+            export_guides, "📄 Export Patient CSV", lambda: gui_export_report(patient_list), style_role="success"
         )
         create_dashboard_button(
             export_guides,
             "⚠️ Abnormal Summary Snapshot",
-            lambda: gui_abnormal_summary(patient_list),
+            lambda: gui_abnormal_summary(patient_list, role_rules()),
             style_role="alert",
         )
 
@@ -1662,4 +1807,7 @@ def launch_gui(
     theme_combo.bind("<<ComboboxSelected>>", on_theme_change)
     on_theme_change()
 
+    root.after(250, stores.prefetch)
     root.mainloop()
+    # Leave a fresh cache behind so the next launch can warm start.
+    snapshot_patients(patient_list, stores.loaded())
@@ -0,0 +1,386 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from utils import optional_numpy
+
+HISTORY_DIRNAME = "patient_history"
+HISTORY_SUFFIX = ".vitals"
+LEGACY_SUFFIX = ".json"
+DIAGNOSES_FILE = "diagnoses.txt"
+
+MAGIC = b"SRVH"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+# timestamp (epoch s), HR, systolic, diastolic, temp (F), interned diagnosis id
+RECORD = struct.Struct("<dhhhfI")
+MISSING = -1
+
+VitalsColumns = namedtuple("VitalsColumns", "timestamp hr systolic diastolic temp_f diagnosis_id")
+COLUMN_TYPES = (("timestamp", "d"), ("hr", "h"), ("systolic", "h"), ("diastolic", "h"), ("temp_f", "f"), ("diagnosis_id", "I"))
+RECORD_DTYPE = None
+
+_DIAGNOSES = None
+_DIAGNOSIS_IDS = None
+_LOCK = threading.Lock()
+
+
+def _numpy():
+    global RECORD_DTYPE
+    np = optional_numpy()
+    if np is not None and RECORD_DTYPE is None:
+        RECORD_DTYPE = np.dtype(
+            [("timestamp", "<f8"), ("hr", "<i2"), ("systolic", "<i2"), ("diastolic", "<i2"), ("temp_f", "<f4"), ("diagnosis_id", "<u4")]
+        )
+    return np
+
+
+def history_dir():
+    path = os.path.join(os.path.dirname(__file__), HISTORY_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def history_path(patient_id):
+    return os.path.join(history_dir(), f"{patient_id}{HISTORY_SUFFIX}")
+
+
+def _load_diagnoses():
+    global _DIAGNOSES, _DIAGNOSIS_IDS
+    if _DIAGNOSES is None:
+        path = os.path.join(history_dir(), DIAGNOSES_FILE)
+        names = []
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                names = [line.rstrip("\n") for line in f]
+        _DIAGNOSES = names
+        _DIAGNOSIS_IDS = {name: idx for idx, name in enumerate(names)}
+    return _DIAGNOSES
+
+
+def intern_diagnosis(name):
+    name = " ".join(str(name or "").split())
+    with _LOCK:
+        _load_diagnoses()
+        idx = _DIAGNOSIS_IDS.get(name)
+        if idx is None:
+            idx = len(_DIAGNOSES)
+            with open(os.path.join(history_dir(), DIAGNOSES_FILE), "a", encoding="utf-8") as f:
+                f.write(name + "\n")
+            _DIAGNOSES.append(name)
+            _DIAGNOSIS_IDS[name] = idx
+    return idx
+
+
+def diagnosis_name(idx):
+    with _LOCK:
+        names = _load_diagnoses()
+    return names[idx] if 0 <= idx < len(names) else ""
+
+
+def _parse_int(value):
+    try:
+        number = int(float(value))
+    except (ValueError, TypeError):
+        return MISSING
+    return number if 0 <= number <= 32767 else MISSING
+
+
+def _parse_bp(value):
+    try:
+        systolic, diastolic = str(value).split("/")
+    except (ValueError, AttributeError):
+        return MISSING, MISSING
+    return _parse_int(systolic), _parse_int(diastolic)
+
+
+def _parse_temp(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return math.nan
+
+
+def _open_for_append(path):
+    f = open(path, "ab")
+    if f.tell() == 0:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+    return f
+
+
+def append_vitals(patient_id, hr, systolic, diastolic, temp_f, diagnosis="", timestamp=None):
+    record = RECORD.pack(
+        time.time() if timestamp is None else timestamp,
+        hr,
+        systolic,
+        diastolic,
+        temp_f,
+        intern_diagnosis(diagnosis),
+    )
+    with _open_for_append(history_path(patient_id)) as f:
+        f.write(record)
+
+
+def append_patient(patient, timestamp=None):
+    systolic, diastolic = _parse_bp(patient.get("BP"))
+    append_vitals(
+        patient["patient_id"],
+        _parse_int(patient.get("HR")),
+        systolic,
+        diastolic,
+        _parse_temp(patient.get("Temp")),
+        patient.get("Diagnosis", ""),
+        timestamp,
+    )
+
+
+def history_version(patient_id):
+    """Records on disk for a patient; history is append-only, so this changes whenever it does."""
+    try:
+        size = os.path.getsize(history_path(patient_id))
+    except OSError:
+        return 0
+    return max(0, size - HEADER.size) // RECORD.size
+
+
+def _read_body(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return b""
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a v{VERSION} vitals history file")
+        body = f.read()
+    # Ignore a torn trailing record left by an interrupted append.
+    return body[: len(body) - len(body) % RECORD.size]
+
+
+def load_columns(patient_id):
+    path = history_path(patient_id)
+    if not os.path.isfile(path):
+        _migrate_file(os.path.join(history_dir(), f"{patient_id}{LEGACY_SUFFIX}"))
+    columns = VitalsColumns(array("d"), array("h"), array("h"), array("h"), array("f"), array("I"))
+    if not os.path.isfile(path):
+        return columns
+    for record in RECORD.iter_unpack(_read_body(path)):
+        for column, value in zip(columns, record):
+            column.append(value)
+    return columns
+
+
+def load_records(patient_id):
+    columns = load_columns(patient_id)
+    records = []
+    for ts, hr, systolic, diastolic, temp_f, dx in zip(*columns):
+        records.append(
+            {
+                "Time": datetime.fromtimestamp(ts).strftime("%I:%M %p"),
+                "HR": "" if hr == MISSING else hr,
+                "BP": "" if MISSING in (systolic, diastolic) else f"{systolic}/{diastolic}",
+                "Temp": "" if math.isnan(temp_f) else f"{temp_f:.1f}",
+                "Diagnosis": diagnosis_name(dx),
+            }
+        )
+    return records
+
+
+class _Timestamps:
+    def __init__(self, view):
+        self.view = view
+
+    def __len__(self):
+        return len(self.view)
+
+    def __getitem__(self, index):
+        return struct.unpack_from("<d", self.view.raw, index * RECORD.size)[0]
+
+
+class HistoryView:
+    """Read-only, memory-mapped window over a patient's vitals records.
+
+    Slicing (by index or with between()) returns another view over the same
+    mapping without copying; closing the view returned by open_history()
+    invalidates its slices. With NumPy installed, records and column() are
+    array views straight onto the file; otherwise raw is a memoryview of the
+    packed records and column() builds an array for just the viewed window.
+    """
+
+    def __init__(self, raw, start=0, stop=None, owner=None, mapping=None):
+        self._raw = raw
+        self.start = start
+        self.stop = len(raw) // RECORD.size if stop is None else stop
+        self._owner = owner
+        self._mapping = mapping
+
+    @property
+    def raw(self):
+        return self._raw[self.start * RECORD.size : self.stop * RECORD.size]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("HistoryView slices must be contiguous")
+            return HistoryView(self._raw, self.start + start, self.start + max(start, stop), self._owner or self)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return RECORD.unpack_from(self._raw, (self.start + index) * RECORD.size)
+
+    @property
+    def records(self):
+        np = _numpy()
+        if np is None:
+            return self.raw
+        return np.frombuffer(self._raw, dtype=RECORD_DTYPE, count=len(self), offset=self.start * RECORD.size)
+
+    def column(self, name):
+        if _numpy() is not None:
+            return self.records[name]
+        position = [field for field, _ in COLUMN_TYPES].index(name)
+        values = array(COLUMN_TYPES[position][1])
+        values.extend(record[position] for record in RECORD.iter_unpack(self.raw))
+        return values
+
+    def between(self, t_start, t_end):
+        """Records with t_start <= timestamp < t_end (history is appended in time order)."""
+        timestamps = _Timestamps(self)
+        lo = bisect.bisect_left(timestamps, t_start)
+        hi = bisect.bisect_left(timestamps, t_end, lo)
+        return self[lo:hi]
+
+    def close(self):
+        if self._owner is not None:
+            return
+        try:
+            self._raw.release()
+            if self._mapping is not None:
+                self._mapping.close()
+        except BufferError:
+            # NumPy views handed out by records/column() still reference the
+            # mapping; it is unmapped once they are garbage collected.
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_history(patient_id):
+    path = history_path(patient_id)
+    if not os.path.isfile(path):
+        _migrate_file(os.path.join(history_dir(), f"{patient_id}{LEGACY_SUFFIX}"))
+    return open_history_file(path)
+
+
+def open_history_file(path):
+    """HistoryView over a vitals file; empty when the file is missing or has no records."""
+    if not os.path.isfile(path) or os.path.getsize(path) <= HEADER.size:
+        return HistoryView(memoryview(b""))
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, record_size = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        mapping.close()
+        raise ValueError(f"{path} is not a v{VERSION} vitals history file")
+    count = (len(mapping) - HEADER.size) // RECORD.size
+    return HistoryView(memoryview(mapping)[HEADER.size : HEADER.size + count * RECORD.size], mapping=mapping)
+
+
+def _legacy_timestamp(label, fallback):
+    day = datetime.fromtimestamp(fallback).date()
+    try:
+        clock = datetime.strptime(str(label).strip(), "%I:%M %p").time()
+    except ValueError:
+        return fallback
+    return datetime.combine(day, clock).timestamp()
+
+
+def _legacy_timestamps(labels, fallback):
+    """Epoch times for a history's time-of-day labels, which carry no date.
+
+    The last entry is dated on the day of fallback (the file's mtime); walking
+    back, a clock time later than the entry after it means midnight was
+    crossed, so the day steps back. The result never decreases. Unreadable
+    labels take the time of the entry after them.
+    """
+    stamps = []
+    later = fallback
+    day = datetime.fromtimestamp(fallback).date()
+    for label in reversed(labels):
+        try:
+            clock = datetime.strptime(str(label).strip(), "%I:%M %p").time()
+        except ValueError:
+            stamps.append(later)
+            continue
+        if datetime.combine(day, clock).timestamp() > later:
+            day -= timedelta(days=1)
+        later = datetime.combine(day, clock).timestamp()
+        stamps.append(later)
+    return stamps[::-1]
+
+
+def _migrate_file(json_path):
+    if not os.path.isfile(json_path):
+        return 0
+    patient_id = os.path.basename(json_path)[: -len(LEGACY_SUFFIX)]
+    target = history_path(patient_id)
+    if os.path.isfile(target):
+        return 0
+    with open(json_path, "r", encoding="utf-8") as f:
+        try:
+            entries = json.load(f)
+        except json.JSONDecodeError:
+            entries = []
+    if not isinstance(entries, list):
+        entries = []
+    timestamps = _legacy_timestamps([entry.get("Time") for entry in entries], os.path.getmtime(json_path))
+    tmp_path = target + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with _open_for_append(tmp_path) as f:
+        for entry, timestamp in zip(entries, timestamps):
+            systolic, diastolic = _parse_bp(entry.get("BP"))
+            f.write(
+                RECORD.pack(
+                    timestamp,
+                    _parse_int(entry.get("HR")),
+                    systolic,
+                    diastolic,
+                    _parse_temp(entry.get("Temp")),
+                    intern_diagnosis(entry.get("Diagnosis", "")),
+                )
+            )
+    os.replace(tmp_path, target)
+    os.replace(json_path, json_path + ".migrated")
+    return len(entries)
+
+
+def migrate_json_history():
+    """Convert every legacy patient_history/<id>.json into the binary format."""
+    directory = history_dir()
+    migrated = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(LEGACY_SUFFIX):
+            migrated[name[: -len(LEGACY_SUFFIX)]] = _migrate_file(os.path.join(directory, name))
+    return migrated
+
+
+if __name__ == "__main__":
+    results = migrate_json_history()
+    print(f"Migrated {len(results)} history files ({sum(results.values())} entries)")
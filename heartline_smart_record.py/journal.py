@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import threading
+
+import codec
+import persistence
+
+JOURNAL_SUFFIX = ".journal"
+CHECKPOINT_FORMAT = "smart-record-checkpoint"
+COMPACT_THRESHOLD = 256 * 1024
+# "flush" hands each batch to the OS; "fsync" also forces it to the disk before returning.
+SYNC_MODE = "flush"
+
+# Journal lines look like {"seq": 12, "op": "append", "path": ["003"], "value": {...}}.
+# A path step that is a dict matches the first list item whose fields equal it,
+# so records with ids (tasks) can be addressed without knowing their position.
+
+log = logging.getLogger(__name__)
+
+
+class _Journal:
+    def __init__(self, filename):
+        self.path = filename + JOURNAL_SUFFIX
+        self.lock = threading.RLock()
+        self.seq = None
+        self.compacting = False
+        self.pending = []
+
+
+_JOURNALS = {}
+_JOURNALS_LOCK = threading.Lock()
+
+
+def _journal(filename):
+    key = os.path.abspath(filename)
+    with _JOURNALS_LOCK:
+        journal = _JOURNALS.get(key)
+        if journal is None:
+            journal = _JOURNALS[key] = _Journal(filename)
+    return journal
+
+
+def store_files(filename):
+    return [filename, filename + JOURNAL_SUFFIX]
+
+
+def _read_checkpoint(filename, empty):
+    if not os.path.isfile(filename):
+        return empty(), 0
+    try:
+        data = codec.read_file(filename)
+    except codec.DECODE_ERRORS:
+        return empty(), 0
+    if isinstance(data, dict) and data.get("format") == CHECKPOINT_FORMAT:
+        return data.get("data", empty()), data.get("seq", 0)
+    return data, 0
+
+
+def _read_journal(path):
+    if not os.path.isfile(path):
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                log.warning("%s: skipping unreadable line %d", path, number)
+
+
+def _trim_torn_tail(path):
+    """Cut a partial or garbled last line left by a crash mid-append.
+
+    Otherwise the next append would run on from the fragment and both lines
+    would be lost to every later replay.
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, "r+b") as f:
+        body = f.read()
+        end = len(body)
+        while end:
+            start = body.rfind(b"\n", 0, end - 1) + 1
+            line = body[start:end]
+            if line.endswith(b"\n"):
+                try:
+                    json.loads(line)
+                    break
+                except ValueError:
+                    pass
+            end = start
+        if end < len(body):
+            log.warning("%s: dropping %d bytes of torn entry at the end", path, len(body) - end)
+            f.truncate(end)
+
+
+def _position(container, key):
+    if isinstance(key, dict):
+        for index, item in enumerate(container):
+            if all(item.get(field) == value for field, value in key.items()):
+                return index
+        raise KeyError(key)
+    return key
+
+
+def _apply(data, entry):
+    op = entry.get("op")
+    path = entry.get("path", [])
+    parents = path if op == "append" else path[:-1]
+    target = data
+    for key in parents:
+        if op == "append" and isinstance(target, dict) and key not in target:
+            target = target.setdefault(key, [])
+        else:
+            target = target[_position(target, key)]
+    if op == "append":
+        target.append(entry["value"])
+    elif op == "set":
+        target[_position(target, path[-1])] = entry["value"]
+    elif op == "delete":
+        del target[_position(target, path[-1])]
+
+
+def _replay(filename, empty):
+    """(data, seq): the checkpoint with every journal entry after it applied.
+
+    An entry that does not apply (a set on a record already gone, say) is
+    logged and skipped; the edits after it still replay. seq is the highest
+    seq in the files, applied or not, so new entries never reuse one.
+    """
+    data, base = _read_checkpoint(filename, empty)
+    seq = base
+    path = filename + JOURNAL_SUFFIX
+    for entry in _read_journal(path):
+        entry_seq = entry.get("seq", 0) if isinstance(entry, dict) else 0
+        seq = max(seq, entry_seq)
+        if entry_seq <= base:
+            continue
+        try:
+            _apply(data, entry)
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError) as exc:
+            log.warning("%s: skipping entry %s that does not apply (%r)", path, entry_seq, exc)
+    return data, seq
+
+
+def _write_pending(journal):
+    with journal.lock:
+        if not journal.pending:
+            return 0
+        lines, journal.pending = journal.pending, []
+        try:
+            with open(journal.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                if SYNC_MODE == "fsync":
+                    os.fsync(f.fileno())
+                return f.tell()
+        except OSError:
+            journal.pending[:0] = lines
+            raise
+
+
+def _flush(filename, empty):
+    journal = _journal(filename)
+    size = _write_pending(journal)
+    if size >= COMPACT_THRESHOLD and not journal.compacting:
+        journal.compacting = True
+        threading.Thread(target=_compact_in_background, args=(filename, empty), daemon=True).start()
+
+
+def _compact_in_background(filename, empty):
+    try:
+        compact(filename, empty)
+    except Exception:
+        # Nobody is waiting on this thread; the journal stays and still replays.
+        log.exception("Compacting %s failed", filename)
+
+
+def load(filename, empty):
+    journal = _journal(filename)
+    with journal.lock:
+        _write_pending(journal)
+        _trim_torn_tail(journal.path)
+        data, journal.seq = _replay(filename, empty)
+    return data
+
+
+def _resume(journal, filename, empty):
+    """First touch of a store this run: repair the journal's tail and pick up its seq."""
+    if journal.seq is None:
+        _trim_torn_tail(journal.path)
+        journal.seq = _replay(filename, empty)[1]
+
+
+def record(filename, op, path, value=None, empty=list):
+    journal = _journal(filename)
+    with journal.lock:
+        _resume(journal, filename, empty)
+        journal.seq += 1
+        entry = {"seq": journal.seq, "op": op, "path": list(path)}
+        if op != "delete":
+            entry["value"] = value
+        journal.pending.append(json.dumps(entry, separators=(",", ":")) + "\n")
+    persistence.schedule(journal.path, lambda: _flush(filename, empty))
+
+
+def _write_checkpoint(data, seq, filename):
+    tmp_path = filename + ".tmp"
+    codec.write_file({"format": CHECKPOINT_FORMAT, "seq": seq, "data": data}, tmp_path)
+    os.replace(tmp_path, filename)
+
+
+def checkpoint(data, filename, empty=list):
+    """Write the full store and drop the journal it supersedes."""
+    journal = _journal(filename)
+    with journal.lock:
+        _resume(journal, filename, empty)
+        journal.pending.clear()
+        _write_checkpoint(data, journal.seq, filename)
+        if os.path.isfile(journal.path):
+            os.remove(journal.path)
+
+
+def compact(filename, empty=list):
+    """Fold the on-disk journal into a fresh checkpoint."""
+    journal = _journal(filename)
+    try:
+        with journal.lock:
+            _write_pending(journal)
+            if not os.path.isfile(journal.path):
+                return
+            data, seq = _replay(filename, empty)
+            _write_checkpoint(data, seq, filename)
+            os.remove(journal.path)
+            journal.seq = seq
+    finally:
+        journal.compacting = False
@@ -1,25 +1,21 @@
-import json
-import os
 from datetime import datetime
 
+import journal
+import search_index
+from workers import STORE_LOCK
+
 MED_FILE = "medications.json"
 
 
 def load_medications(filename: str = MED_FILE):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
+    data = journal.load(filename, dict)
+    if isinstance(data, dict):
+        return data
     return {}
 
 
 def save_medications(data, filename: str = MED_FILE):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    journal.checkpoint(data, filename, dict)
 
 
 def add_medication(data, patient_id, name, dose, schedule, priority="do soon"):
@@ -31,16 +27,19 @@ def add_medication(data, patient_id, name, dose, schedule, priority="do soon"):
         "given": False,
         "last_updated": datetime.now().isoformat(),
     }
-    data.setdefault(patient_id, []).append(entry)
-    save_medications(data)
+    with STORE_LOCK:
+        data.setdefault(patient_id, []).append(entry)
+    journal.record(MED_FILE, "append", [patient_id], entry, dict)
+    search_index.INDEX.add_medication(patient_id, entry)
     return entry
 
 
 def toggle_med(data, patient_id, index):
     meds = data.get(patient_id, [])
     if 0 <= index < len(meds):
-        meds[index]["given"] = not meds[index].get("given", False)
-        meds[index]["last_updated"] = datetime.now().isoformat()
-        save_medications(data)
+        with STORE_LOCK:
+            meds[index]["given"] = not meds[index].get("given", False)
+            meds[index]["last_updated"] = datetime.now().isoformat()
+        journal.record(MED_FILE, "set", [patient_id, index], meds[index], dict)
         return meds[index]
     return None
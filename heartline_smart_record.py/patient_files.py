@@ -1,58 +1,77 @@
-import json
-import os
 from datetime import datetime
+import os
+
+import journal
+from workers import STORE_LOCK
 
 PATIENT_FILES = "patient_files.json"
 
 
 def load_patient_files(filename: str = PATIENT_FILES):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
+    data = journal.load(filename, dict)
+    if isinstance(data, dict):
+        return data
     return {}
 
 
 def save_patient_files(files, filename: str = PATIENT_FILES):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(files, f, indent=2)
+    journal.checkpoint(files, filename, dict)
 
 
 def ensure_patient_record(files, patient_id):
-    record = files.setdefault(
-        patient_id,
-        {
-            "goals": [],
-            "discharge_ready": False,
-            "assigned_by": "",
-            "photo": "",
-        },
-    )
+    with STORE_LOCK:
+        record = files.setdefault(
+            patient_id,
+            {
+                "goals": [],
+                "discharge_ready": False,
+                "assigned_by": "",
+                "photo": "",
+            },
+        )
     return record
 
 
 def update_goals(files, patient_id, goals, assigned_by="", filename: str = PATIENT_FILES):
     record = ensure_patient_record(files, patient_id)
-    record["goals"] = goals
-    record["assigned_by"] = assigned_by
-    save_patient_files(files, filename)
+    with STORE_LOCK:
+        record["goals"] = goals
+        record["assigned_by"] = assigned_by
+    journal.record(filename, "set", [patient_id], record, dict)
     return record
 
 
 def set_discharge_status(files, patient_id, status, filename: str = PATIENT_FILES):
     record = ensure_patient_record(files, patient_id)
-    record["discharge_ready"] = status
-    save_patient_files(files, filename)
+    with STORE_LOCK:
+        record["discharge_ready"] = status
+    journal.record(filename, "set", [patient_id], record, dict)
     return record
 
 
 def set_photo(files, patient_id, photo_path, filename: str = PATIENT_FILES):
     record = ensure_patient_record(files, patient_id)
-    record["photo"] = photo_path
-    record.setdefault("photo_updated", datetime.now().isoformat())
-    save_patient_files(files, filename)
+    with STORE_LOCK:
+        record["photo"] = photo_path
+        record.setdefault("photo_updated", datetime.now().isoformat())
+    journal.record(filename, "set", [patient_id], record, dict)
     return record
+
+
+def load_thumbnail(path, size=(200, 200)):
+    """Decode and shrink a photo to (mode, size, pixel bytes), or None without Pillow or the file.
+
+    Plain bytes so the work can run in a worker process; Image.frombytes
+    rebuilds the picture on the Tk side.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    if not path or not os.path.isfile(path):
+        return None
+    with Image.open(path) as img:
+        img.thumbnail(size)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        return img.mode, img.size, img.tobytes()
@@ -1,70 +1,29 @@
+from array import array
 from datetime import datetime
 import csv
-import os
-import json
-from tkinter import messagebox
-import matplotlib.pyplot as plt
-
-from data_access import append_to_csv, save_to_json
+import math
+import threading
+
+import alert_rules
+from data_access import Patient, PatientRegistry, append_to_csv, as_patient, find_patient
+import history_store
+import search_index
+import sqlite_cache
+from tasks import TaskList
 from timeline import log_timeline
-from utils import RED, RESET, typeprint, normalize_bp, normalize_dob, normalize_temp
-
-
-def _is_abnormal_hr(hr, low=40, high=110):
-    try:
-        hr_val = int(hr)
-    except (ValueError, TypeError):
-        return False
-    return hr_val < low or hr_val > high
+from utils import RED, RESET, optional_numpy, typeprint, normalize_bp, normalize_dob, normalize_temp
+from workers import STORE_LOCK
 
-
-def _is_abnormal_bp(bp, sys_low=90, sys_high=150, dias_low=50, dias_high=100):
-    try:
-        systolic, diastolic = map(int, bp.split("/"))
-    except (ValueError, AttributeError):
-        return False
-    return systolic < sys_low or systolic > sys_high or diastolic < dias_low or diastolic > dias_high
-
-
-def _is_abnormal_temp(temp, low=95.0, high=100.4):
-    try:
-        temp_val = float(temp)
-    except (ValueError, TypeError):
-        return False
-    return temp_val < low or temp_val > high
-
-
-def _history_dir():
-    path = os.path.join(os.path.dirname(__file__), "patient_history")
-    os.makedirs(path, exist_ok=True)
-    return path
+REPORT_CHUNK = 1000
+_REPORT_LOCK = threading.Lock()
 
 
 def load_history(patient_id):
-    history_file = os.path.join(_history_dir(), f"{patient_id}.json")
-    if os.path.isfile(history_file):
-        with open(history_file, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
+    return history_store.load_records(patient_id)
 
 
 def append_history(patient):
-    history = load_history(patient["patient_id"])
-    history.append(
-        {
-            "Time": patient.get("Time"),
-            "HR": patient.get("HR"),
-            "BP": patient.get("BP"),
-            "Temp": patient.get("Temp"),
-            "Diagnosis": patient.get("Diagnosis"),
-        }
-    )
-    history_file = os.path.join(_history_dir(), f"{patient['patient_id']}.json")
-    with open(history_file, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
+    history_store.append_patient(patient)
 
 
 def add_patient(
@@ -95,24 +54,26 @@ def add_patient(
         return
 
     time_stamp = datetime.now().strftime("%I:%M %p")
-    patient = {
-        "patient_id": patient_id,
-        "name": name,
-        "DOB": DOB,
-        "HR": HR,
-        "BP": BP,
-        "Temp": Temp,
-        "CC": chief_complaint,
-        "Diagnosis": diagnosis,
-        "RN_AP": RN_AP,
-        "Time": time_stamp,
-    }
-
-    patient_list.append(patient)
+    patient = Patient(
+        patient_id=patient_id,
+        name=name,
+        DOB=DOB,
+        HR=HR,
+        BP=BP,
+        Temp=Temp,
+        CC=chief_complaint,
+        Diagnosis=diagnosis,
+        RN_AP=RN_AP,
+        Time=time_stamp,
+    )
+
+    with STORE_LOCK:
+        patient_list.append(patient)
     append_to_csv(patient)
     append_history(patient)
-    save_to_json(patient)
-    append_history(patient)
+    sqlite_cache.mark_dirty(patient_id)
+    search_index.INDEX.add_patient(patient)
+    alert_rules.BOARD.update(patient)
     if timeline_entries is not None:
         log_timeline(
             timeline_entries,
@@ -123,12 +84,14 @@ def add_patient(
 
     typeprint("\nNew Patient Added Successfully! 🎀")
     view_patients(patient_list)
-    systolic, diastolic = map(int, BP.split("/"))
-    if int(HR) < 40 or int(HR) > 110 or systolic < 90 or systolic > 150 or diastolic < 50 or diastolic > 100:
+    _, flags = alert_rules.rules_for().evaluate(patient)
+    if flags & (alert_rules.VITAL_BITS["HR"] | alert_rules.VITAL_BITS["BP"]):
+        from tkinter import messagebox
+
         messagebox.showwarning("⚠️ Abnormal Vitals Alert", f"{name}'s vitals are abnormal!")
 
 
-def view_patients(patient_list):
+def view_patients(patient_list, rules=None):
     if not patient_list:
         print("No patient records yet")
         return
@@ -136,9 +99,9 @@ def view_patients(patient_list):
     print(f"{'patient_id':<12}{'name':<15}{'DOB':<15}{'HR':<10}{'BP':<12}{'Temp':<8}{'CC':<15}{'Diagnosis':<15}{'RN_AP':<6}")
     print("-" * 80)
 
-    for p in patient_list:
-        systolic, diastolic = map(int, p["BP"].split("/"))
-        is_abnormal = (systolic > 140 or systolic < 90) or (diastolic > 100 or diastolic < 50)
+    assessment = alert_rules.assess(patient_list, rules)
+    for index, p in enumerate(assessment.patients):
+        is_abnormal = assessment.flagged(index, "BP")
         bp_display = f"{RED}{p['BP']}{RESET}" if is_abnormal else p["BP"]
 
         typeprint(
@@ -148,25 +111,25 @@ def view_patients(patient_list):
 
 
 def search_patient(patient_list, patient_id):
-    for patient in patient_list:
-        if patient["patient_id"] == patient_id:
-            typeprint("\nPatient Record Found!!")
-            print(f"{'ID':<10}{'Name':<15}{'DOB':<15}")
-            typeprint(f"{patient['patient_id']:<10}{patient['name']:<15}{patient['DOB']:<15}")
-            return
+    patient = find_patient(patient_list, patient_id)
+    if patient:
+        typeprint("\nPatient Record Found!!")
+        print(f"{'ID':<10}{'Name':<15}{'DOB':<15}")
+        typeprint(f"{patient['patient_id']:<10}{patient['name']:<15}{patient['DOB']:<15}")
+        return
     typeprint("\nNo patient found with that ID, try again :D")
 
 
-def get_abnormal_HR(patient_list, HR_low=40, HR_high=110):
-    return [p for p in patient_list if int(p["HR"]) < HR_low or int(p["HR"]) > HR_high]
+def get_abnormal_HR(patient_list, rules=None):
+    return alert_rules.assess(patient_list, rules).select("HR")
 
 
-def count_abnormal_HR(patient_list, HR_low=40, HR_high=110):
-    return len(get_abnormal_HR(patient_list, HR_low, HR_high))
+def count_abnormal_HR(patient_list, rules=None):
+    return alert_rules.assess(patient_list, rules).count("HR")
 
 
-def display_abnormal_HR(patient_list, HR_low=40, HR_high=110):
-    abnormal_list = get_abnormal_HR(patient_list, HR_low, HR_high)
+def display_abnormal_HR(patient_list, rules=None):
+    abnormal_list = get_abnormal_HR(patient_list, rules)
     print("\nAbnormal Heart Rate Patients:")
     typeprint("{:<10}{:<15}{:<15}{:<6}".format("ID", "Name", "DOB", "HR"))
     print("-" * 45)
@@ -175,66 +138,74 @@ def display_abnormal_HR(patient_list, HR_low=40, HR_high=110):
     print(f"\nTotal: {len(abnormal_list)}")
 
 
-def get_abnormal_BP(patient_list, sys_low=90, sys_high=140, dias_low=50, dias_high=100):
-    abnormal_list = []
-    for p in patient_list:
-        systolic, diastolic = map(int, p["BP"].split("/"))
-        if systolic < sys_low or systolic > sys_high or diastolic < dias_low or diastolic > dias_high:
-            abnormal_list.append(p)
-    return abnormal_list
+def get_abnormal_BP(patient_list, rules=None):
+    return alert_rules.assess(patient_list, rules).select("BP")
 
 
-def count_abnormal_BP(patient_list, sys_low=90, sys_high=150, dias_low=50, dias_high=100):
-    return len(get_abnormal_BP(patient_list, sys_low, sys_high, dias_low, dias_high))
+def count_abnormal_BP(patient_list, rules=None):
+    return alert_rules.assess(patient_list, rules).count("BP")
 
 
-def display_abnormal_BP(patient_list, sys_low=90, sys_high=150, dias_low=50, dias_high=100):
-    abnormal_list = get_abnormal_HR(patient_list)
-    print(f"\nAbnormal HR count: {len(abnormal_list)}")
-    print("{:<10}{:<15}{:<15}{:<6}".format("ID", "Name", "DOB", "HR"))
-    print("-" * 45)
+def display_abnormal_BP(patient_list, rules=None):
+    abnormal_list = get_abnormal_BP(patient_list, rules)
+    print(f"\nAbnormal BP count: {len(abnormal_list)}")
+    print("{:<10}{:<15}{:<15}{:<8}".format("ID", "Name", "DOB", "BP"))
+    print("-" * 47)
     for p in abnormal_list:
-        typeprint("{:<10}{:<15}{:<15}{:<6}".format(p["patient_id"], p["name"], p["DOB"], p["HR"]))
+        typeprint("{:<10}{:<15}{:<15}{:<8}".format(p["patient_id"], p["name"], p["DOB"], p["BP"]))
 
 
-def abnormal_summary(patient_list, HR_low=40, HR_high=110, sys_low=90, sys_high=150, dias_low=50, dias_high=100):
+def abnormal_summary(patient_list, rules=None):
     if not patient_list:
         print("No patient record found :( Try again!)")
         return
     typeprint(f"\n{'ID':<8}{'Name':<15}{'HR':<8}{'BP':<10}{'Status':<12}")
 
-    for p in patient_list:
-        hr = int(p["HR"])
-        hr_display = f"{RED}{hr}{RESET}" if hr < HR_low or hr > HR_high else str(hr)
-
-        systolic, diastolic = map(int, p["BP"].split("/"))
-        if systolic < sys_low or systolic > sys_high or diastolic < dias_low or diastolic > dias_high:
-            bp_display = f"{RED}{p['BP']}{RESET}"
-        else:
-            bp_display = p["BP"]
+    assessment = alert_rules.assess(patient_list, rules)
+    for index, p in enumerate(assessment.patients):
+        hr_abnormal = assessment.flagged(index, "HR")
+        bp_abnormal = assessment.flagged(index, "BP")
+        hr_display = f"{RED}{p['HR']}{RESET}" if hr_abnormal else str(p["HR"])
+        bp_display = f"{RED}{p['BP']}{RESET}" if bp_abnormal else p["BP"]
 
         status = []
-        if hr < HR_low or hr > HR_high:
+        if hr_abnormal:
             status.append("HR abnormal!")
-        if systolic < sys_low or systolic > sys_high or diastolic < dias_low or diastolic > dias_high:
+        if bp_abnormal:
             status.append("BP abnormal!")
         status = ", ".join(status) if status else "Normal"
 
         typeprint(f"{p['patient_id']:<8}{p['name']:<12}{'DOB':<15}{hr_display:<10}{bp_display:<12}{status:<12}")
 
 
-def export_report(patient_list, filename="report"):
-    report = patient_list
-    with open(filename, "w", newline="") as f:
+def write_report(patient_list, filename="report", progress=None):
+    """Write the CSV report; safe to run off the Tk thread.
+
+    The rows are copied under the store lock first, so edits made while the
+    file is written neither block on it nor tear a row.
+    """
+    with STORE_LOCK:
+        rows = [[p["patient_id"], p["name"], p["DOB"], p["HR"], p["BP"], p["Temp"]] for p in patient_list]
+    # Two exports to the same file would interleave their rows; take turns.
+    with _REPORT_LOCK, open(filename, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["ID", "Name", "DOB", "HR", "BP", "Temp"])
-        for p in report:
-            writer.writerow([p["patient_id"], p["name"], p["DOB"], p["HR"], p["BP"], p["Temp"]])
-        messagebox.showinfo("Export", f"Report saved as {filename}")
+        for start in range(0, len(rows), REPORT_CHUNK):
+            writer.writerows(rows[start : start + REPORT_CHUNK])
+            if progress is not None:
+                progress(min(start + REPORT_CHUNK, len(rows)), len(rows))
+    return filename
+
+
+def export_report(patient_list, filename="report"):
+    from tkinter import messagebox
+
+    write_report(patient_list, filename)
+    messagebox.showinfo("Export", f"Report saved as {filename}")
 
 
 def update_vitals(patient_list, patient_id, updates, timeline_entries=None):
-    patient = next((p for p in patient_list if p["patient_id"] == patient_id), None)
+    patient = find_patient(patient_list, patient_id)
     if not patient:
         typeprint("\nNo patient found with that ID, try again!\n")
         return False
@@ -246,14 +217,20 @@ def update_vitals(patient_list, patient_id, updates, timeline_entries=None):
     diagnosis = updates.get("Diagnosis") or patient.get("Diagnosis", "")
     rn = updates.get("RN_AP") or patient.get("RN_AP", "")
 
-    patient["HR"] = hr
-    patient["BP"] = bp
-    patient["Temp"] = temp
-    patient["Time"] = new_time
-    patient["Diagnosis"] = diagnosis
-    patient["RN_AP"] = rn
-
+    with STORE_LOCK:
+        patient["HR"] = hr
+        patient["BP"] = bp
+        patient["Temp"] = temp
+        patient["Time"] = new_time
+        patient["Diagnosis"] = diagnosis
+        patient["RN_AP"] = rn
+        if isinstance(patient_list, PatientRegistry):
+            patient_list.changed(patient)
     append_to_csv(patient)
+    append_history(patient)
+    sqlite_cache.mark_dirty(patient_id)
+    search_index.INDEX.add_patient(patient)
+    alert_rules.BOARD.update(patient)
     typeprint("\nVitals updated successfully :D\n")
     typeprint(
         f"{patient['patient_id']:<8}{patient['name']:<12}{patient['DOB']:<15}{patient['HR']:<8}"
@@ -269,60 +246,72 @@ def update_vitals(patient_list, patient_id, updates, timeline_entries=None):
     return True
 
 
+def _complete_readings(view):
+    """(timestamps, HR, systolic, diastolic) copied out of a HistoryView, minus readings missing a vital.
+
+    A function of its own so the NumPy column views die with its frame and
+    the caller can unmap the file when it closes the view.
+    """
+    columns = [view.column(name) for name in ("timestamp", "hr", "systolic", "diastolic")]
+    if optional_numpy() is not None:
+        valid = (columns[1] != history_store.MISSING) & (columns[2] != history_store.MISSING)
+        valid &= columns[3] != history_store.MISSING
+        # Boolean indexing copies.
+        return tuple(column[valid] for column in columns)
+    series = (array("d"), array("h"), array("h"), array("h"))
+    for values in zip(*columns):
+        if history_store.MISSING not in values[1:]:
+            for column, value in zip(series, values):
+                column.append(value)
+    return series
+
+
+def trend_series(patient):
+    """Full-resolution (timestamps, HR, systolic, diastolic) columns for a patient's chart, oldest first.
+
+    Readings with a missing vital are left out. Without any history the
+    current vitals make a single point at the patient's last update time.
+    """
+    with history_store.open_history(patient["patient_id"]) as view:
+        series = _complete_readings(view)
+    if not len(series[0]):
+        with STORE_LOCK:
+            record = as_patient(patient)
+            if math.isnan(record.hr) or math.isnan(record.systolic):
+                return series
+            timestamp = history_store._legacy_timestamp(record.get("Time"), datetime.now().timestamp())
+            series = ([timestamp], [record.hr], [record.systolic], [record.diastolic])
+    return series
+
+
 def plot_trend(patient_list, patient_id):
-    patient_data = [p for p in patient_list if p["patient_id"] == patient_id]
-    if not patient_data:
-        messagebox.showerror("Error!", "Patient not found, Try Again!")
-        return
+    from tkinter import messagebox
+    import charts
 
-    history = load_history(patient_id)
-    all_records = history if history else patient_data
-
-    cleaned_points = []
-    for idx, record in enumerate(all_records, start=1):
-        label = record.get("Time") or f"Entry {idx}"
-        try:
-            hr_value = int(record["HR"])
-            systolic, diastolic = map(int, record["BP"].split("/"))
-        except (ValueError, TypeError, AttributeError):
-            continue
-        cleaned_points.append((label, hr_value, systolic, diastolic))
-
-    if not cleaned_points:
-        messagebox.showerror("Not Enough Data", "This patient does not have valid vitals to chart yet.")
+    patient = find_patient(patient_list, patient_id)
+    if not patient:
+        messagebox.showerror("Error!", "Patient not found, Try Again!")
         return
+    charts.show_trend(patient_id, *(charts.cached_trend(patient_id) or charts.load_trend(patient)))
 
-    times, HRs, systolics, diastolics = zip(*cleaned_points)
-    plt.figure(figsize=(8, 4))
-    plt.plot(times, HRs, marker="o", label="HR")
-    plt.plot(times, systolics, label="Systolic BP")
-    plt.plot(times, diastolics, label="Diastolic BP")
-    plt.xlabel("Time")
-    plt.ylabel("Vitals")
-    plt.title(f"Vitals Trend for Patient {patient_id}")
-    plt.legend()
-    plt.show()
 
-
-def create_handoff_summary(patient_list, tasks=None):
+def create_handoff_summary(patient_list, tasks=None, rules=None):
     if not patient_list:
         return "No patients recorded yet."
 
-    task_lookup = {}
-    if tasks:
-        for task in tasks:
-            if task.get("status") == "done":
-                continue
-            task_lookup.setdefault(task["patient_id"], []).append(task)
+    if tasks and not isinstance(tasks, TaskList):
+        tasks = TaskList(tasks)
+
+    assessment = alert_rules.assess(patient_list, rules)
 
     lines = []
     lines.append("Smart Record Handoff Summary")
     lines.append("-" * 32)
-    for patient in patient_list:
-        hr_status = "⚠️" if _is_abnormal_hr(patient["HR"]) else "✅"
-        bp_status = "⚠️" if _is_abnormal_bp(patient["BP"]) else "✅"
-        temp_status = "⚠️" if _is_abnormal_temp(patient["Temp"]) else "✅"
-        outstanding = len(task_lookup.get(patient["patient_id"], []))
+    for index, patient in enumerate(assessment.patients):
+        hr_status = "⚠️" if assessment.flagged(index, "HR") else "✅"
+        bp_status = "⚠️" if assessment.flagged(index, "BP") else "✅"
+        temp_status = "⚠️" if assessment.flagged(index, "Temp") else "✅"
+        outstanding = tasks.open_count(patient["patient_id"]) if tasks else 0
         lines.append(
             f"{patient['patient_id']} • {patient['name']} ({patient['DOB']})\n"
             f"   HR {patient['HR']} {hr_status} | BP {patient['BP']} {bp_status} | Temp {patient['Temp']} {temp_status}\n"
@@ -331,62 +320,21 @@ def create_handoff_summary(patient_list, tasks=None):
     return "\n".join(lines)
 
 
-def plot_abnormal_overview(patient_list):
+def plot_abnormal_overview(patient_list, rules=None):
+    from tkinter import messagebox
+    import charts
+
     if not patient_list:
         messagebox.showinfo("Info", "No patient records to chart yet.")
         return
 
-    hr_count = sum(1 for p in patient_list if _is_abnormal_hr(p["HR"]))
-    bp_count = sum(1 for p in patient_list if _is_abnormal_bp(p["BP"]))
-    temp_count = sum(1 for p in patient_list if _is_abnormal_temp(p["Temp"]))
-
-    labels = ["Heart Rate", "Blood Pressure", "Temperature"]
-    values = [hr_count, bp_count, temp_count]
-    colors = ["#f48fb1", "#f6bd60", "#9cc5c9"]
-
-    plt.figure(figsize=(6, 4))
-    bars = plt.bar(labels, values, color=colors)
-    for bar, value in zip(bars, values):
-        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.1, str(value), ha="center", va="bottom")
-    plt.title("Abnormal Vitals Overview")
-    plt.ylabel("Patient Count")
-    plt.ylim(0, max(values + [1]) + 1)
-    plt.show()
-
-
-def priority_alerts(patient_list):
-    alerts = []
-    for patient in patient_list:
-        severity = None
-        details = []
-        if _is_abnormal_hr(patient["HR"], low=45, high=130):
-            details.append(f"HR {patient['HR']}")
-            severity = "critical"
-        elif _is_abnormal_hr(patient["HR"]):
-            details.append(f"HR {patient['HR']}")
-            severity = severity or "warning"
-
-        if _is_abnormal_bp(patient["BP"], sys_low=85, sys_high=170, dias_low=45, dias_high=110):
-            details.append(f"BP {patient['BP']}")
-            severity = "critical"
-        elif _is_abnormal_bp(patient["BP"]):
-            details.append(f"BP {patient['BP']}")
-            severity = severity or "warning"
-
-        if _is_abnormal_temp(patient["Temp"], low=94.0, high=102.0):
-            details.append(f"Temp {patient['Temp']}")
-            severity = severity or "warning"
-        elif _is_abnormal_temp(patient["Temp"]):
-            details.append(f"Temp {patient['Temp']}")
-            severity = severity or "info"
-
-        if details:
-            alerts.append(
-                {
-                    "patient_id": patient["patient_id"],
-                    "name": patient["name"],
-                    "severity": severity or "info",
-                    "details": ", ".join(details),
-                }
-            )
-    return alerts
+    assessment = alert_rules.assess(patient_list, rules)
+    charts.show_overview([assessment.count("HR"), assessment.count("BP"), assessment.count("Temp")])
+
+
+def priority_alerts(patient_list, rules=None):
+    assessment = alert_rules.assess(patient_list, rules)
+    return [
+        alert_rules.alert_for(assessment.patients[index], assessment.ranks[index], assessment.flags[index])
+        for index in assessment.rows()
+    ]
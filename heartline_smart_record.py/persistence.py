@@ -0,0 +1,90 @@
+import atexit
+import threading
+import time
+
+DEBOUNCE_SECONDS = 0.4
+MAX_LATENCY_SECONDS = 2.0
+
+
+class PersistenceScheduler:
+    """Coalesces bursts of saves into one background flush.
+
+    schedule(key, callback) marks a store dirty; only the latest callback per
+    key runs. Pending work is flushed once no new save arrives for `debounce`
+    seconds, and never later than `max_latency` seconds after the first
+    unsaved change. With write_behind off every callback runs immediately.
+    """
+
+    def __init__(self, debounce=DEBOUNCE_SECONDS, max_latency=MAX_LATENCY_SECONDS, write_behind=True):
+        self.debounce = debounce
+        self.max_latency = max_latency
+        self.write_behind = write_behind
+        self._pending = {}
+        self._first_dirty = None
+        self._last_dirty = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, key, callback):
+        if not self.write_behind:
+            callback()
+            return
+        with self._cond:
+            now = time.monotonic()
+            self._pending[key] = callback
+            if self._first_dirty is None:
+                self._first_dirty = now
+            self._last_dirty = now
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="persistence-flush", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _deadline(self):
+        return min(self._last_dirty + self.debounce, self._first_dirty + self.max_latency)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while self._pending and time.monotonic() < self._deadline():
+                    self._cond.wait(self._deadline() - time.monotonic())
+            self.flush()
+
+    def flush(self):
+        """Run every pending save now; blocks until they are on disk."""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+                self._first_dirty = self._last_dirty = None
+            errors = []
+            for callback in pending.values():
+                try:
+                    callback()
+                except OSError as exc:
+                    errors.append(exc)
+            if errors:
+                raise errors[0]
+
+    def attach(self, root):
+        """Flush when the Tk root window is destroyed."""
+
+        def on_destroy(event):
+            if event.widget is root:
+                self.flush()
+
+        root.bind("<Destroy>", on_destroy, add="+")
+
+
+SCHEDULER = PersistenceScheduler()
+atexit.register(SCHEDULER.flush)
+
+
+def schedule(key, callback):
+    SCHEDULER.schedule(key, callback)
+
+
+def flush():
+    SCHEDULER.flush()
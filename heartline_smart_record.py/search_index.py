@@ -0,0 +1,440 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import namedtuple
+
+TOKEN_RE = re.compile(r"\w+")
+
+SearchResult = namedtuple("SearchResult", "kind patient_id label details score")
+
+# Result kinds in display order when scores tie.
+KINDS = ("Patient", "Task", "Medication", "Soft Need", "Timeline", "Chat")
+_KIND_RANK = {kind: rank for rank, kind in enumerate(KINDS)}
+
+# A query term that is a whole token outranks one that only prefixes a token.
+EXACT_BONUS = 2
+
+# As-you-type matching: similarity of a prefix match, the trigram (Jaccard)
+# similarity a token needs to count as a fuzzy match, and the similarity given
+# to a token within TYPO_DISTANCE edits of a query word of 4+ letters.
+PREFIX_SIMILARITY = 0.9
+TRIGRAM_THRESHOLD = 0.3
+TYPO_SIMILARITY = 0.5
+TYPO_DISTANCE = 1
+# Cap on tokens one query word expands to, and on candidates checked for typos.
+MAX_EXPANSIONS = 64
+MAX_TYPO_CANDIDATES = 256
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text or "").lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count once), or limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """Inverted token index over every store, ranked by weighted field matches.
+
+    Each query term matches tokens it equals or prefixes, and every term has to
+    match for a document to be returned. Until build() has run the add_*/remove_*
+    hooks do nothing: the first search builds from the full stores anyway.
+    """
+
+    def __init__(self, suggestions=None):
+        self._lock = threading.RLock()
+        self.suggestions = suggestions
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            if self.suggestions is not None:
+                self.suggestions.clear()
+            self.built = False
+            self._docs = {}
+            # key -> kind rank in the high bits, arrival order below: the tie-breaker for equal scores
+            self._ranks = {}
+            self._postings = {}
+            self._vocabulary = []
+            self._added = 0
+            self._bulk = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def token_count(self):
+        with self._lock:
+            return len(self._vocabulary)
+
+    def build(self, patients=(), tasks=(), timeline=(), soft_notes=None, medications=None, messages=()):
+        with self._lock:
+            self.clear()
+            self.built = True
+            # Fresh keys only, and the vocabulary is sorted once at the end.
+            self._bulk = True
+            for patient in patients:
+                self.add_patient(patient)
+            for task in tasks:
+                self.add_task(task)
+            for entry in timeline:
+                self.add_timeline(entry)
+            for patient_id, notes in (soft_notes or {}).items():
+                for entry in notes:
+                    self.add_soft_note(patient_id, entry)
+            for patient_id, meds in (medications or {}).items():
+                for entry in meds:
+                    self.add_medication(patient_id, entry)
+            for entry in messages:
+                self.add_message(entry)
+            self._bulk = False
+            self._vocabulary = sorted(self._postings)
+            if self.suggestions is not None:
+                self.suggestions.build(patients, tasks)
+        return len(self._docs)
+
+    def _add(self, key, ref, kind, patient_id, label, details, fields):
+        if not self.built:
+            return
+        weights = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0) + weight
+        with self._lock:
+            if not self._bulk or key in self._docs:
+                self._remove(key)
+            self._docs[key] = (kind, patient_id, label, details, weights, ref)
+            self._ranks[key] = _KIND_RANK[kind] << 48 | self._added
+            self._added += 1
+            all_postings = self._postings
+            for token, weight in weights.items():
+                postings = all_postings.get(token)
+                if postings is None:
+                    postings = all_postings[token] = {}
+                    self._new_token(token)
+                postings[key] = weight
+
+    def _remove(self, key):
+        with self._lock:
+            doc = self._docs.pop(key, None)
+            if doc is None:
+                return
+            del self._ranks[key]
+            for token in doc[4]:
+                postings = self._postings[token]
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+                    self._drop_token(token)
+
+    def _new_token(self, token):
+        if not self._bulk:
+            bisect.insort(self._vocabulary, token)
+
+    def _drop_token(self, token):
+        if not self._bulk:
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def add_patient(self, patient):
+        if self.suggestions is not None:
+            self.suggestions.add_patient(patient)
+        patient_id = patient["patient_id"]
+        self._add(
+            ("patient", patient_id),
+            patient,
+            "Patient",
+            patient_id,
+            f"{patient_id} - {patient['name']}",
+            patient.get("Diagnosis", ""),
+            [(patient_id, 3), (patient["name"], 3), (patient.get("Diagnosis", ""), 2), (patient.get("CC", ""), 2)],
+        )
+
+    def add_task(self, task):
+        if self.suggestions is not None:
+            self.suggestions.add_task(task)
+        self._add(
+            ("task", task["id"]),
+            task,
+            "Task",
+            task["patient_id"],
+            task["patient_id"],
+            task["description"],
+            [(task["description"], 1), (task["patient_id"], 1)],
+        )
+
+    def remove_task(self, task_id):
+        if self.suggestions is not None:
+            self.suggestions.remove_task(task_id)
+        self._remove(("task", task_id))
+
+    # Entries without an id are keyed by object identity; the index keeps a
+    # reference to each one, so the id cannot be reused while it is indexed.
+    def add_timeline(self, entry):
+        self._add(
+            ("timeline", id(entry)),
+            entry,
+            "Timeline",
+            entry["patient_id"],
+            entry["patient_id"],
+            entry["description"],
+            [(entry["description"], 1), (entry.get("event", ""), 1), (entry["patient_id"], 1)],
+        )
+
+    def add_soft_note(self, patient_id, entry):
+        self._add(
+            ("soft_note", id(entry)),
+            entry,
+            "Soft Need",
+            patient_id,
+            patient_id,
+            entry["note"],
+            [(entry["note"], 1), (patient_id, 1)],
+        )
+
+    def add_medication(self, patient_id, entry):
+        self._add(
+            ("medication", id(entry)),
+            entry,
+            "Medication",
+            patient_id,
+            patient_id,
+            f"{entry['name']} {entry.get('dose', '')} {entry.get('schedule', '')}".strip(),
+            [(entry["name"], 2), (entry.get("schedule", ""), 1), (patient_id, 1)],
+        )
+
+    def add_message(self, entry):
+        self._add(
+            ("chat", id(entry)),
+            entry,
+            "Chat",
+            None,
+            f"{entry['author']} ({entry.get('role', '')})",
+            entry["text"],
+            [(entry["text"], 1), (entry["author"], 1)],
+        )
+
+    def _matches(self, term):
+        """{token: score multiplier} for the vocabulary tokens a query word matches."""
+        found = {}
+        index = bisect.bisect_left(self._vocabulary, term)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(term):
+            token = self._vocabulary[index]
+            found[token] = EXACT_BONUS if token == term else 1
+            index += 1
+        return found
+
+    def search(self, query, limit=50):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            levels = {}
+            if len(terms) == 1:
+                # One word: bucket postings by score directly; a document matching
+                # several tokens keeps its best score because _top skips repeats.
+                for token, factor in self._matches(terms[0]).items():
+                    for key, weight in self._postings[token].items():
+                        levels.setdefault(weight * factor, []).append(key)
+            else:
+                scores = None
+                for term in terms:
+                    term_scores = {}
+                    for token, factor in self._matches(term).items():
+                        for key, weight in self._postings[token].items():
+                            if weight * factor > term_scores.get(key, 0):
+                                term_scores[key] = weight * factor
+                    if scores is None:
+                        scores = term_scores
+                    else:
+                        scores = {key: scores[key] + score for key, score in term_scores.items() if key in scores}
+                    if not scores:
+                        return []
+                for key, score in scores.items():
+                    levels.setdefault(score, []).append(key)
+            return [SearchResult(*self._docs[key][:4], score) for score, key in self._top(levels, limit)]
+
+    def _top(self, levels, limit):
+        """The `limit` best (score, key) pairs from {score: [keys]}; ties rank by kind, then arrival."""
+        ranked = []
+        seen = set()
+        for score in sorted(levels, reverse=True):
+            keys = [key for key in dict.fromkeys(levels[score]) if key not in seen]
+            best = heapq.nsmallest(limit - len(ranked), keys, key=self._ranks.__getitem__)
+            ranked.extend((score, key) for key in best)
+            if len(ranked) >= limit:
+                break
+            seen.update(best)
+        return ranked
+
+    def suggest(self, query, limit=8):
+        if self.suggestions is None:
+            return []
+        return self.suggestions.search(query, limit)
+
+
+class FuzzyIndex(SearchIndex):
+    """Trigram and prefix index over patient ids, names, diagnoses and task text.
+
+    Built for as-you-type lookups: a query word matches tokens it prefixes and,
+    for alphabetic words, tokens with similar trigrams or one typo away, so
+    'jonh' still finds John. Scores are similarities weighted by field.
+    """
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._grams = {}
+            self._gram_counts = {}
+
+    def build(self, patients=(), tasks=()):
+        return super().build(patients, tasks)
+
+    def _new_token(self, token):
+        super()._new_token(token)
+        grams = trigrams(token)
+        self._gram_counts[token] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(token)
+
+    def _drop_token(self, token):
+        super()._drop_token(token)
+        del self._gram_counts[token]
+        for gram in trigrams(token):
+            self._grams[gram].discard(token)
+
+    def add_patient(self, patient):
+        patient_id = patient["patient_id"]
+        self._add(
+            ("patient", patient_id),
+            patient,
+            "Patient",
+            patient_id,
+            f"{patient_id} - {patient['name']}",
+            patient.get("Diagnosis", ""),
+            [(patient_id, 3), (patient["name"], 3), (patient.get("Diagnosis", ""), 2)],
+        )
+
+    def add_task(self, task):
+        self._add(
+            ("task", task["id"]),
+            task,
+            "Task",
+            task["patient_id"],
+            task["patient_id"],
+            task["description"],
+            [(task["description"], 1)],
+        )
+
+    def _matches(self, term):
+        """{token: similarity} for the vocabulary tokens a query word matches."""
+        found = {}
+        index = bisect.bisect_left(self._vocabulary, term)
+        while index < len(self._vocabulary) and len(found) < MAX_EXPANSIONS:
+            token = self._vocabulary[index]
+            if not token.startswith(term):
+                break
+            found[token] = 1.0 if token == term else PREFIX_SIMILARITY
+            index += 1
+        # Ids and numbers match by prefix only; a "typo" there is a different patient.
+        if len(term) < 3 or not term.isalpha():
+            return found
+
+        grams = trigrams(term)
+        shared = {}
+        for gram in grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        typo_candidates = []
+        for token, count in shared.items():
+            similarity = count / (len(grams) + self._gram_counts[token] - count)
+            if similarity >= TRIGRAM_THRESHOLD:
+                if similarity > found.get(token, 0):
+                    found[token] = similarity
+            elif len(term) >= 4 and count >= 2:
+                typo_candidates.append((count, token))
+        for _, token in heapq.nlargest(MAX_TYPO_CANDIDATES, typo_candidates):
+            if token not in found and _edit_distance(term, token, TYPO_DISTANCE) <= TYPO_DISTANCE:
+                found[token] = TYPO_SIMILARITY
+        if len(found) > MAX_EXPANSIONS:
+            found = dict(heapq.nlargest(MAX_EXPANSIONS, found.items(), key=lambda item: item[1]))
+        return found
+
+    def search(self, query, limit=8):
+        return super().search(query, limit)
+
+    def suggest(self, query, limit=8):
+        return self.search(query, limit)
+
+
+INDEX = SearchIndex(suggestions=FuzzyIndex())
+
+
+def ensure_index(patients=(), tasks=(), timeline=(), soft_notes=None, medications=None, messages=()):
+    """Build the shared index from the given stores unless it is already live."""
+    if not INDEX.built:
+        INDEX.build(patients, tasks, timeline, soft_notes, medications, messages)
+    return INDEX
+
+
+def search(query, limit=50):
+    return INDEX.search(query, limit)
+
+
+def suggest(query, limit=8):
+    return INDEX.suggest(query, limit)
+
+
+def rebuild():
+    """Re-read every store from disk (or the warm cache) and rebuild the shared index."""
+    from sqlite_cache import warm_start
+
+    state = warm_start()
+    return INDEX.build(
+        state["patients"],
+        state["tasks"],
+        state["timeline"],
+        state["soft_notes"],
+        state["medications"],
+        state["team_messages"],
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Smart Record search index")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    # The index lives in memory only; each run builds it from the stores and discards it.
+    subcommands.add_parser("stats", help="index the stores and report the index's size")
+    query_parser = subcommands.add_parser("query", help="index the stores, then print ranked results for a query")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    documents = rebuild()
+    if args.command == "stats":
+        print(f"Indexed {documents} records, {INDEX.token_count} distinct tokens")
+    else:
+        for result in search(args.text, args.limit):
+            print(f"{result.score:>4}  {result.kind:<11}{result.label:<24}{result.details}")
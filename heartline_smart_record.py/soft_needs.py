@@ -1,25 +1,21 @@
-import json
-import os
 from datetime import datetime
 
+import journal
+import search_index
+from workers import STORE_LOCK
+
 SOFT_NEEDS_FILE = "soft_needs.json"
 
 
 def load_soft_needs(filename: str = SOFT_NEEDS_FILE):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
+    data = journal.load(filename, dict)
+    if isinstance(data, dict):
+        return data
     return {}
 
 
 def save_soft_needs(notes, filename: str = SOFT_NEEDS_FILE):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(notes, f, indent=2)
+    journal.checkpoint(notes, filename, dict)
 
 
 def add_soft_note(notes, patient_id, cue, filename: str = SOFT_NEEDS_FILE):
@@ -27,8 +23,10 @@ def add_soft_note(notes, patient_id, cue, filename: str = SOFT_NEEDS_FILE):
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "note": cue,
     }
-    notes.setdefault(patient_id, []).append(entry)
-    save_soft_needs(notes, filename)
+    with STORE_LOCK:
+        notes.setdefault(patient_id, []).append(entry)
+    journal.record(filename, "append", [patient_id], entry, dict)
+    search_index.INDEX.add_soft_note(patient_id, entry)
     return entry
 
 
@@ -1,50 +1,240 @@
+import json
 import sqlite3
 import os
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+
+import journal
+import persistence
+from data_access import PatientRegistry, coerce_patient_row, load_from_csv, store_version
+from medications import MED_FILE, load_medications
+from patient_files import PATIENT_FILES, load_patient_files
+from soft_needs import SOFT_NEEDS_FILE, load_soft_needs
+from tasks import TASKS_FILE, TaskList, load_tasks
+from team_chat import CHAT_FILE, load_messages
+from timeline import TIMELINE_FILE, Timeline, load_timeline
+from workers import STORE_LOCK
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "smart_record_cache.db")
 
+SnapshotResult = namedtuple("SnapshotResult", "rows_written elapsed_ms")
+
+PATIENTS = "patients"
+
+
+def _file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append([stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+# Store name -> (signature of the flat source the cached copy must match, flat-file loader)
+STORE_SOURCES = {
+    PATIENTS: (store_version, load_from_csv),
+    "tasks": (partial(_file_signature, journal.store_files(TASKS_FILE)), load_tasks),
+    "timeline": (partial(_file_signature, journal.store_files(TIMELINE_FILE)), load_timeline),
+    "soft_notes": (partial(_file_signature, journal.store_files(SOFT_NEEDS_FILE)), load_soft_needs),
+    "patient_files": (partial(_file_signature, journal.store_files(PATIENT_FILES)), load_patient_files),
+    "medications": (partial(_file_signature, journal.store_files(MED_FILE)), load_medications),
+    "team_messages": (partial(_file_signature, journal.store_files(CHAT_FILE)), load_messages),
+}
+
+# Stores whose cached JSON payload is rebuilt into an indexed collection.
+STORE_TYPES = {"tasks": TaskList, "timeline": Timeline}
+
+PATIENT_COLUMNS = ("patient_id", "name", "DOB", "HR", "BP", "Temp", "Diagnosis", "Time", "CC", "RN_AP")
 
-def snapshot_patients(patient_list):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS patients (
-            patient_id TEXT PRIMARY KEY,
-            name TEXT,
-            DOB TEXT,
-            HR TEXT,
-            BP TEXT,
-            Temp TEXT,
-            Diagnosis TEXT,
-            Time TEXT
-        )
-        """
+UPSERT_PATIENT = """
+INSERT INTO patients (patient_id, name, DOB, HR, BP, Temp, Diagnosis, Time, CC, RN_AP)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(patient_id) DO UPDATE SET
+    name=excluded.name,
+    DOB=excluded.DOB,
+    HR=excluded.HR,
+    BP=excluded.BP,
+    Temp=excluded.Temp,
+    Diagnosis=excluded.Diagnosis,
+    Time=excluded.Time,
+    CC=excluded.CC,
+    RN_AP=excluded.RN_AP
+"""
+
+UPSERT_STORE = """
+INSERT INTO stores (name, payload, signature, saved_at) VALUES (?, ?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET
+    payload=excluded.payload,
+    signature=excluded.signature,
+    saved_at=excluded.saved_at
+"""
+
+
+def source_signature(name):
+    return json.dumps(STORE_SOURCES[name][0]())
+
+
+def _patient_row(patient):
+    return (
+        patient["patient_id"],
+        patient["name"],
+        patient["DOB"],
+        patient["HR"],
+        patient["BP"],
+        patient["Temp"],
+        patient.get("Diagnosis", ""),
+        patient.get("Time", ""),
+        patient.get("CC", ""),
+        patient.get("RN_AP", ""),
     )
-    for patient in patient_list:
-        cur.execute(
-            """
-            INSERT INTO patients (patient_id, name, DOB, HR, BP, Temp, Diagnosis, Time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(patient_id) DO UPDATE SET
-                name=excluded.name,
-                DOB=excluded.DOB,
-                HR=excluded.HR,
-                BP=excluded.BP,
-                Temp=excluded.Temp,
-                Diagnosis=excluded.Diagnosis,
-                Time=excluded.Time
-            """,
-            (
-                patient["patient_id"],
-                patient["name"],
-                patient["DOB"],
-                patient["HR"],
-                patient["BP"],
-                patient["Temp"],
-                patient.get("Diagnosis", ""),
-                patient.get("Time", ""),
-            ),
-        )
-    conn.commit()
-    conn.close()
+
+
+class SnapshotEngine:
+    """Writes only the patients and stores changed since the previous snapshot."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._snapshotted = set()
+        self._store_signatures = {}
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS patients (
+                    patient_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    DOB TEXT,
+                    HR TEXT,
+                    BP TEXT,
+                    Temp TEXT,
+                    Diagnosis TEXT,
+                    Time TEXT
+                )
+                """
+            )
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(patients)")}
+            for column in ("CC", "RN_AP"):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE patients ADD COLUMN {column} TEXT")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stores (
+                    name TEXT PRIMARY KEY,
+                    payload TEXT,
+                    signature TEXT NOT NULL,
+                    saved_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def mark_dirty(self, patient_id):
+        with self._lock:
+            self._dirty.add(patient_id)
+
+    def snapshot(self, patient_list, stores=None):
+        started = time.perf_counter()
+        # Signatures must describe files that already hold everything being cached.
+        persistence.flush()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            now = time.time()
+            signatures = {PATIENTS: source_signature(PATIENTS)}
+            store_rows = [(PATIENTS, None, signatures[PATIENTS], now)]
+            for name in stores or {}:
+                signatures[name] = source_signature(name)
+            # Copy out of the live stores in one go; the GUI may be editing them from the Tk thread.
+            with STORE_LOCK:
+                changed = {}
+                for patient in patient_list:
+                    patient_id = patient["patient_id"]
+                    if patient_id in dirty or patient_id not in self._snapshotted:
+                        # Later rows win, matching the last-write-wins roster.
+                        changed[patient_id] = _patient_row(patient)
+                for name, data in (stores or {}).items():
+                    if signatures[name] != self._store_signatures.get(name):
+                        store_rows.append((name, json.dumps(data, separators=(",", ":")), signatures[name], now))
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(UPSERT_PATIENT, changed.values())
+                    conn.executemany(UPSERT_STORE, store_rows)
+            except sqlite3.Error:
+                self._dirty |= dirty
+                raise
+            self._snapshotted.update(changed)
+            self._store_signatures.update(signatures)
+        return SnapshotResult(len(changed) + len(store_rows) - 1, (time.perf_counter() - started) * 1000)
+
+    def load_cached(self, names):
+        """Return {name: data} for every requested store whose source files are unchanged."""
+        if not os.path.isfile(self.path):
+            return {}
+        with self._lock:
+            conn = self._connection()
+            cached = {
+                name: (payload, signature)
+                for name, payload, signature in conn.execute("SELECT name, payload, signature FROM stores")
+            }
+            fresh = {}
+            for name in names:
+                payload, signature = cached.get(name, (None, None))
+                if signature is None or signature != source_signature(name):
+                    continue
+                if name == PATIENTS:
+                    rows = conn.execute(f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients ORDER BY rowid")
+                    fresh[name] = PatientRegistry(coerce_patient_row(dict(zip(PATIENT_COLUMNS, row))) for row in rows)
+                    self._snapshotted.update(patient["patient_id"] for patient in fresh[name])
+                elif payload is not None:
+                    fresh[name] = json.loads(payload)
+                    if name in STORE_TYPES:
+                        fresh[name] = STORE_TYPES[name](fresh[name])
+                self._store_signatures[name] = signature
+        return fresh
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_ENGINE = SnapshotEngine()
+
+
+def mark_dirty(patient_id):
+    _ENGINE.mark_dirty(patient_id)
+
+
+def snapshot_patients(patient_list, stores=None):
+    return _ENGINE.snapshot(patient_list, stores)
+
+
+def warm_load(name):
+    cached = _ENGINE.load_cached([name])
+    if name in cached:
+        return cached[name]
+    return STORE_SOURCES[name][1]()
+
+
+def warm_start():
+    """Load every store, preferring the cache and re-reading flat files only where they changed."""
+    state = _ENGINE.load_cached(list(STORE_SOURCES))
+    for name, (_, loader) in STORE_SOURCES.items():
+        if name not in state:
+            state[name] = loader()
+    return state
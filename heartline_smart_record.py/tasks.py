@@ -1,22 +1,129 @@
-import json
-import os
 import uuid
 
+import journal
+import search_index
+from workers import STORE_LOCK
+
 TASKS_FILE = "tasks.json"
+DONE = "done"
+DEFAULT_PRIORITY = "do soon"
+
+
+class TaskList(list):
+    """The task list plus indexes by id, patient and status and per-priority counts.
+
+    Behaves as a plain list; add_task, toggle_task and delete_task update the
+    indexes incrementally, other list mutations rebuild them.
+    """
+
+    def __init__(self, tasks=()):
+        super().__init__(tasks)
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {}
+        self._by_patient = {}
+        self._by_status = {}
+        self._open_by_patient = {}
+        self._priority_counts = {}
+        for task in self:
+            self._index(task)
+
+    def _index(self, task):
+        self._by_id[task["id"]] = task
+        self._by_patient.setdefault(task["patient_id"], []).append(task)
+        self._by_status.setdefault(task.get("status", "pending"), {})[task["id"]] = task
+        priority = task.get("priority", DEFAULT_PRIORITY)
+        self._priority_counts[priority] = self._priority_counts.get(priority, 0) + 1
+        if task.get("status") != DONE:
+            self._open_by_patient[task["patient_id"]] = self._open_by_patient.get(task["patient_id"], 0) + 1
+
+    def _unindex(self, task):
+        self._by_id.pop(task["id"], None)
+        self._by_patient[task["patient_id"]].remove(task)
+        self._by_status[task.get("status", "pending")].pop(task["id"], None)
+        self._priority_counts[task.get("priority", DEFAULT_PRIORITY)] -= 1
+        if task.get("status") != DONE:
+            self._open_by_patient[task["patient_id"]] -= 1
+
+    def get(self, task_id, default=None):
+        return self._by_id.get(task_id, default)
+
+    def for_patient(self, patient_id):
+        return list(self._by_patient.get(patient_id, ()))
+
+    def with_status(self, status):
+        return list(self._by_status.get(status, {}).values())
+
+    def open_count(self, patient_id):
+        return self._open_by_patient.get(patient_id, 0)
+
+    def priority_counts(self):
+        return dict(self._priority_counts)
+
+    def set_status(self, task, status):
+        previous = task.get("status", "pending")
+        self._by_status[previous].pop(task["id"], None)
+        self._by_status.setdefault(status, {})[task["id"]] = task
+        was_open, is_open = task.get("status") != DONE, status != DONE
+        self._open_by_patient[task["patient_id"]] = self.open_count(task["patient_id"]) + is_open - was_open
+        task["status"] = status
+
+    def discard(self, task):
+        self._unindex(task)
+        # By identity: list.remove would take the first task that merely compares equal.
+        for index, item in enumerate(self):
+            if item is task:
+                super().__delitem__(index)
+                return
+
+    def append(self, task):
+        super().append(task)
+        self._index(task)
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def __iadd__(self, tasks):
+        self.extend(tasks)
+        return self
+
+    def insert(self, index, task):
+        super().insert(index, task)
+        self._reindex()
+
+    def remove(self, task):
+        super().remove(task)
+        self._reindex()
+
+    def pop(self, index=-1):
+        task = super().pop(index)
+        self._reindex()
+        return task
+
+    def clear(self):
+        super().clear()
+        self._reindex()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reindex()
 
 
 def load_tasks(filename: str = TASKS_FILE):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                return data
-    return []
+    data = journal.load(filename, list)
+    if isinstance(data, list):
+        return TaskList(data)
+    return TaskList()
 
 
 def save_tasks(tasks, filename: str = TASKS_FILE):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(tasks, f, indent=2)
+    journal.checkpoint(list(tasks), filename, list)
 
 
 def add_task(tasks, patient_id, description, due="", priority="do soon", filename: str = TASKS_FILE):
@@ -28,28 +135,66 @@ def add_task(tasks, patient_id, description, due="", priority="do soon", filenam
         "priority": priority,
         "status": "pending",
     }
-    tasks.append(task)
-    save_tasks(tasks, filename)
+    with STORE_LOCK:
+        tasks.append(task)
+    journal.record(filename, "append", [], task)
+    search_index.INDEX.add_task(task)
     return task
 
 
 def toggle_task(tasks, task_id, filename: str = TASKS_FILE):
+    if isinstance(tasks, TaskList):
+        task = tasks.get(task_id)
+        if task is None:
+            return None
+        with STORE_LOCK:
+            tasks.set_status(task, "pending" if task.get("status") == DONE else DONE)
+        journal.record(filename, "set", [{"id": task_id}], task)
+        return task
     for task in tasks:
         if task["id"] == task_id:
-            task["status"] = "done" if task.get("status") != "done" else "pending"
-            save_tasks(tasks, filename)
+            with STORE_LOCK:
+                task["status"] = "done" if task.get("status") != "done" else "pending"
+            journal.record(filename, "set", [{"id": task_id}], task)
             return task
     return None
 
 
 def delete_task(tasks, task_id, filename: str = TASKS_FILE):
-    initial_len = len(tasks)
-    tasks[:] = [task for task in tasks if task["id"] != task_id]
-    if len(tasks) != initial_len:
-        save_tasks(tasks, filename)
-        return True
-    return False
+    """Remove every task with this id; False if there was none."""
+    with STORE_LOCK:
+        removed = [task for task in tasks if task["id"] == task_id]
+        if isinstance(tasks, TaskList):
+            for task in removed:
+                tasks.discard(task)
+        else:
+            tasks[:] = [task for task in tasks if task["id"] != task_id]
+    if not removed:
+        return False
+    # A journaled delete removes the first match on replay; one per task keeps replay in step.
+    for _ in removed:
+        journal.record(filename, "delete", [{"id": task_id}])
+    search_index.INDEX.remove_task(task_id)
+    return True
 
 
 def tasks_for_patient(tasks, patient_id):
+    if isinstance(tasks, TaskList):
+        return tasks.for_patient(patient_id)
     return [task for task in tasks if task["patient_id"] == patient_id]
+
+
+def open_task_count(tasks, patient_id):
+    if isinstance(tasks, TaskList):
+        return tasks.open_count(patient_id)
+    return sum(1 for task in tasks if task["patient_id"] == patient_id and task.get("status") != DONE)
+
+
+def priority_counts(tasks):
+    if isinstance(tasks, TaskList):
+        return tasks.priority_counts()
+    counts = {}
+    for task in tasks:
+        priority = task.get("priority", DEFAULT_PRIORITY)
+        counts[priority] = counts.get(priority, 0) + 1
+    return counts
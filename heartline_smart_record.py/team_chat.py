@@ -1,19 +1,16 @@
-import json
-import os
 from datetime import datetime
 
+import journal
+import search_index
+from workers import STORE_LOCK
+
 CHAT_FILE = "team_chat.json"
 
 
 def load_messages(filename: str = CHAT_FILE):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-            except json.JSONDecodeError:
-                pass
+    data = journal.load(filename, list)
+    if isinstance(data, list):
+        return data
     return []
 
 
@@ -24,7 +21,8 @@ def add_message(messages, author, role, text, filename: str = CHAT_FILE):
         "role": role,
         "text": text,
     }
-    messages.append(entry)
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(messages, f, indent=2)
+    with STORE_LOCK:
+        messages.append(entry)
+    journal.record(filename, "append", [], entry)
+    search_index.INDEX.add_message(entry)
     return entry
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules import each other as top-level names.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import journal  # noqa: E402
+import persistence  # noqa: E402
+
+
+@pytest.fixture
+def restart(monkeypatch):
+    """Flush pending writes and forget every open journal, as a fresh start of the app would."""
+
+    def restart():
+        persistence.flush()
+        monkeypatch.setattr(journal, "_JOURNALS", {})
+
+    yield restart
+    persistence.flush()
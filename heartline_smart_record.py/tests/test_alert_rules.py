@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import alert_rules
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"default": {"warning": {"SpO2": [90, 100]}}},
+        [{"default": {}}],
+        {"default": {"warning": {"HR": [1]}}},
+        {"default": {"warning": ["HR"]}},
+        {"default": alert_rules.DEFAULT_RULES, "units": {"icu": {"critical": {"HR": ["low", 130]}}}},
+    ],
+)
+def test_invalid_config_falls_back_to_defaults(tmp_path, config):
+    filename = str(tmp_path / "alert_rules.json")
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    rules = alert_rules.rules_for("icu", filename=filename)
+
+    assert rules.tiers == alert_rules.DEFAULT_RULES
+
+
+def test_unit_overrides_apply(tmp_path):
+    filename = str(tmp_path / "alert_rules.json")
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"units": {"icu": {"critical": {"HR": [50, 120]}}}}, f)
+
+    rules = alert_rules.rules_for("icu", filename=filename)
+
+    assert rules.tiers["critical"]["HR"] == [50, 120]
+    assert rules.tiers["warning"] == alert_rules.DEFAULT_RULES["warning"]
@@ -0,0 +1,40 @@
+import pytest
+
+import downsample
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(downsample, "optional_numpy", lambda: None)
+    return request.param
+
+
+def _flat(values):
+    return [float(value) for value in values]
+
+
+def test_minmax_keeps_the_earliest_of_tied_values(backend):
+    x = list(range(12))
+    y = [5, 9, 1, 9, 1, 5, 7, 7, 7, 7, 2, 3]
+
+    kept_x, kept_y = downsample.minmax(x, y, 3)
+
+    assert _flat(kept_x) == [0, 1, 2, 4, 6, 8, 10, 11]
+    assert _flat(kept_y) == [5, 9, 1, 1, 7, 7, 2, 3]
+
+
+def test_minmax_matches_across_backends(monkeypatch):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(7)
+    x = np.sort(rng.uniform(0, 1000, 5000))
+    y = rng.integers(60, 70, 5000)
+
+    fast = downsample.minmax(x, y, 100)
+    monkeypatch.setattr(downsample, "optional_numpy", lambda: None)
+    slow = downsample.minmax(x.tolist(), y.tolist(), 100)
+
+    assert _flat(fast[0]) == _flat(slow[0])
+    assert _flat(fast[1]) == _flat(slow[1])
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import history_store
+
+
+def test_legacy_labels_roll_back_a_day_across_midnight():
+    mtime = datetime(2025, 3, 12, 9, 0).timestamp()
+    labels = ["10:00 PM", "11:30 PM", "not a time", "02:15 AM", "08:45 AM"]
+
+    stamps = history_store._legacy_timestamps(labels, mtime)
+
+    assert [datetime.fromtimestamp(stamp) for stamp in stamps] == [
+        datetime(2025, 3, 11, 22, 0),
+        datetime(2025, 3, 11, 23, 30),
+        datetime(2025, 3, 12, 2, 15),
+        datetime(2025, 3, 12, 2, 15),
+        datetime(2025, 3, 12, 8, 45),
+    ]
+
+
+def test_legacy_labels_spanning_days_stay_sorted():
+    mtime = datetime(2025, 3, 12, 6, 0).timestamp()
+    labels = ["08:00 AM", "08:00 PM", "08:00 AM", "08:00 PM", "08:00 AM"]
+
+    stamps = history_store._legacy_timestamps(labels, mtime)
+
+    assert stamps == sorted(stamps)
+    assert datetime.fromtimestamp(stamps[0]) == datetime(2025, 3, 9, 8, 0)
+    assert datetime.fromtimestamp(stamps[-1]) == datetime(2025, 3, 11, 8, 0)
@@ -0,0 +1,65 @@
+import json
+
+import journal
+import persistence
+import tasks
+
+
+def _seqs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["seq"] for line in f]
+
+
+def test_torn_last_line_is_cut_before_the_next_append(tmp_path, restart):
+    filename = str(tmp_path / "tasks.json")
+    restart()
+    journal.record(filename, "append", [], {"id": "first"})
+    journal.record(filename, "append", [], {"id": "second"})
+    persistence.flush()
+    path = filename + journal.JOURNAL_SUFFIX
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 5)
+
+    restart()
+    data = journal.load(filename, list)
+    journal.record(filename, "append", [], {"id": "third"})
+    journal.record(filename, "append", [], {"id": "fourth"})
+    restart()
+
+    assert data == [{"id": "first"}]
+    assert journal.load(filename, list) == [{"id": "first"}, {"id": "third"}, {"id": "fourth"}]
+    assert _seqs(path) == [1, 2, 3]
+
+
+def test_entry_that_does_not_apply_is_skipped(tmp_path, restart):
+    filename = str(tmp_path / "tasks.json")
+    restart()
+    journal.record(filename, "append", [], {"id": "a"})
+    journal.record(filename, "set", [{"id": "gone"}], {"id": "gone"})
+    journal.record(filename, "append", [], {"id": "b"})
+
+    restart()
+    assert journal.load(filename, list) == [{"id": "a"}, {"id": "b"}]
+    journal.record(filename, "append", [], {"id": "c"})
+    persistence.flush()
+    assert _seqs(filename + journal.JOURNAL_SUFFIX) == [1, 2, 3, 4]
+
+    journal.compact(filename, list)
+    restart()
+    assert journal.load(filename, list) == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+
+
+def test_delete_task_removes_every_duplicate_on_both_paths(tmp_path, restart):
+    for kind in (list, tasks.TaskList):
+        filename = str(tmp_path / f"{kind.__name__}.json")
+        restart()
+        rows = [{"id": "a", "patient_id": "1"}, {"id": "b", "patient_id": "1"}, {"id": "a", "patient_id": "2"}]
+        for row in rows:
+            journal.record(filename, "append", [], row)
+        store = kind(dict(row) for row in rows)
+
+        assert tasks.delete_task(store, "a", filename)
+        assert not tasks.delete_task(store, "a", filename)
+        restart()
+        assert [task["id"] for task in store] == ["b"]
+        assert journal.load(filename, list) == [{"id": "b", "patient_id": "1"}]
@@ -0,0 +1,37 @@
+import pytest
+
+import history_store
+import patient_ops
+
+MISSING = history_store.MISSING
+
+
+def _write_history(path, readings):
+    with open(path, "wb") as f:
+        f.write(history_store.HEADER.pack(history_store.MAGIC, history_store.VERSION, history_store.RECORD.size))
+        for timestamp, hr, systolic, diastolic in readings:
+            f.write(history_store.RECORD.pack(timestamp, hr, systolic, diastolic, 98.6, 0))
+
+
+@pytest.fixture
+def history_file(tmp_path):
+    path = str(tmp_path / f"p1{history_store.HISTORY_SUFFIX}")
+    _write_history(
+        path,
+        [(1000.0, 70, 120, 80), (1900.0, 72, 118, MISSING), (2800.0, MISSING, 121, 79), (3700.0, 160, 130, 85)],
+    )
+    return path
+
+
+def test_trend_readings_are_copied_out_before_the_history_closes(history_file):
+    with history_store.open_history_file(history_file) as view:
+        series = patient_ops._complete_readings(view)
+
+    # Still mapped would mean a column view outlived the with block.
+    assert view._mapping.closed
+    assert [list(map(float, column)) for column in series] == [
+        [1000.0, 3700.0],
+        [70.0, 160.0],
+        [120.0, 130.0],
+        [80.0, 85.0],
+    ]
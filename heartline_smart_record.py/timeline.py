@@ -1,38 +1,168 @@
-import json
-import os
+import bisect
 from datetime import datetime
 
+import journal
+import search_index
+from workers import STORE_LOCK
+
 TIMELINE_FILE = "timeline.json"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class _SortedEntries:
+    """Entries kept in (timestamp, arrival) order; in-order appends land at the end."""
+
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+
+    def add(self, key, entry):
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.entries.insert(index, entry)
+
+    def span(self, start, end):
+        lo = 0 if start is None else bisect.bisect_left(self.keys, (start,))
+        hi = len(self.keys) if end is None else bisect.bisect_left(self.keys, (end,), lo)
+        return self.entries[lo:hi]
+
+
+class Timeline(list):
+    """The timeline in arrival order, indexed by timestamp globally and per patient.
+
+    Behaves as a plain list; appends (log_timeline, journal replay) are
+    bisect-inserted into the indexes, other list mutations rebuild them.
+    Timestamps are TIMESTAMP_FORMAT strings, which sort correctly as text.
+    """
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        self._reindex()
+
+    def _reindex(self):
+        self._arrivals = 0
+        self._all = _SortedEntries()
+        self._by_patient = {}
+        for entry in self:
+            self._index(entry)
+
+    def _index(self, entry):
+        key = (entry.get("timestamp", ""), self._arrivals)
+        self._arrivals += 1
+        self._all.add(key, entry)
+        self._by_patient.setdefault(entry.get("patient_id"), _SortedEntries()).add(key, entry)
+
+    def recent(self, limit=25):
+        """Newest first, touching only the last `limit` entries."""
+        return self._all.entries[: -limit - 1 : -1] if limit > 0 else []
+
+    def for_patient(self, patient_id, start=None, end=None):
+        patient = self._by_patient.get(patient_id)
+        return patient.span(start, end) if patient else []
+
+    def between(self, start=None, end=None):
+        """Entries with start <= timestamp < end, oldest first."""
+        return self._all.span(start, end)
+
+    def append(self, entry):
+        super().append(entry)
+        self._index(entry)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def __iadd__(self, entries):
+        self.extend(entries)
+        return self
+
+    def insert(self, index, entry):
+        super().insert(index, entry)
+        self._reindex()
+
+    def remove(self, entry):
+        super().remove(entry)
+        self._reindex()
+
+    def pop(self, index=-1):
+        entry = super().pop(index)
+        self._reindex()
+        return entry
+
+    def clear(self):
+        super().clear()
+        self._reindex()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reindex()
+
+
+def _timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime) else value
 
 
 def load_timeline(filename: str = TIMELINE_FILE):
-    if os.path.isfile(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-            except json.JSONDecodeError:
-                pass
-    return []
+    data = journal.load(filename, list)
+    if isinstance(data, list):
+        return Timeline(data)
+    return Timeline()
 
 
 def save_timeline(entries, filename: str = TIMELINE_FILE):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2)
+    journal.checkpoint(list(entries), filename, list)
 
 
 def log_timeline(entries, patient_id, event_type, description, filename: str = TIMELINE_FILE):
     entry = {
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT),
         "patient_id": patient_id,
         "event": event_type,
         "description": description,
     }
-    entries.append(entry)
-    save_timeline(entries, filename)
+    with STORE_LOCK:
+        entries.append(entry)
+    journal.record(filename, "append", [], entry)
+    search_index.INDEX.add_timeline(entry)
     return entry
 
 
 def recent_events(entries, limit=25):
+    if isinstance(entries, Timeline):
+        return entries.recent(limit)
     return sorted(entries, key=lambda e: e.get("timestamp", ""), reverse=True)[:limit]
+
+
+def events_for_patient(entries, patient_id, start=None, end=None):
+    """A patient's entries oldest first, optionally limited to start <= timestamp < end."""
+    start, end = _timestamp(start), _timestamp(end)
+    if isinstance(entries, Timeline):
+        return entries.for_patient(patient_id, start, end)
+    return sorted(
+        (
+            e
+            for e in entries
+            if e["patient_id"] == patient_id
+            and (start is None or e.get("timestamp", "") >= start)
+            and (end is None or e.get("timestamp", "") < end)
+        ),
+        key=lambda e: e.get("timestamp", ""),
+    )
+
+
+def events_between(entries, start=None, end=None):
+    start, end = _timestamp(start), _timestamp(end)
+    if isinstance(entries, Timeline):
+        return entries.between(start, end)
+    return sorted(
+        (
+            e
+            for e in entries
+            if (start is None or e.get("timestamp", "") >= start) and (end is None or e.get("timestamp", "") < end)
+        ),
+        key=lambda e: e.get("timestamp", ""),
+    )
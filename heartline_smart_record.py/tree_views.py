@@ -0,0 +1,246 @@
+import ttkbootstrap as ttk
+
+WHEEL_ROWS = 3
+
+
+class VirtualTable:
+    """A Treeview that only ever holds the rows on screen.
+
+    rows is any sized, indexable sequence and row_values(row) gives a row's
+    column values. The tree keeps one item per visible line and refills those
+    items as the scrollbar, mouse wheel or keys move the window, so a list of
+    50k rows opens as fast as one of 20. key(row) identifies a row for
+    jump_to() and keeps the selection on the same row while scrolling; it
+    defaults to the row's position.
+    """
+
+    def __init__(self, parent, columns, rows, row_values, key=None, height=12, style=None):
+        self.frame = ttk.Frame(parent, style=style) if style else ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows = rows
+        self.row_values = row_values
+        self.key = key
+        self.first = 0
+        self._slots = []
+        self._shown = []
+        self._selected = None
+        self._selected_index = None
+        self._positions = None
+        self._resize(height)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda _event: self._scroll_break(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda _event: self._scroll_break(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda _event: self._step(-1))
+        self.tree.bind("<Down>", lambda _event: self._step(1))
+        self.tree.bind("<Prior>", lambda _event: self._step(-len(self._slots)))
+        self.tree.bind("<Next>", lambda _event: self._step(len(self._slots)))
+        self.tree.bind("<Home>", lambda _event: self._step(-len(self.rows)))
+        self.tree.bind("<End>", lambda _event: self._step(len(self.rows)))
+        self.refresh()
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def _key_at(self, index):
+        return index if self.key is None else self.key(self.rows[index])
+
+    def _resize(self, count):
+        count = max(1, count)
+        while len(self._slots) < count:
+            # Slots start detached; refresh() attaches the ones that have a row to show.
+            iid = self.tree.insert("", "end")
+            self.tree.detach(iid)
+            self._slots.append(iid)
+            self._shown.append(None)
+        while len(self._slots) > count:
+            self.tree.delete(self._slots.pop())
+            self._shown.pop()
+
+    def _clamp(self, first):
+        return max(0, min(first, len(self.rows) - len(self._slots)))
+
+    def refresh(self):
+        """Redraw the visible window from rows; only lines whose values changed are touched."""
+        self._positions = None
+        self.first = self._clamp(self.first)
+        total = len(self.rows)
+        selected_slot = None
+        for slot, iid in enumerate(self._slots):
+            index = self.first + slot
+            if index < total:
+                values = tuple(self.row_values(self.rows[index]))
+                if self._selected is not None and self._key_at(index) == self._selected:
+                    selected_slot = iid
+            else:
+                values = None
+            if values == self._shown[slot]:
+                continue
+            if values is None:
+                self.tree.detach(iid)
+            else:
+                if self._shown[slot] is None:
+                    self.tree.move(iid, "", slot)
+                self.tree.item(iid, values=values)
+            self._shown[slot] = values
+        if selected_slot is not None:
+            if self.tree.selection() != (selected_slot,):
+                self.tree.selection_set(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + len(self._slots)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.first = 0
+        self.refresh()
+
+    def scroll_to(self, first):
+        first = self._clamp(first)
+        if first != self.first:
+            self.first = first
+            self.refresh()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, "units"|"pages")."""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = len(self._slots) if args[2] == "pages" else 1
+            self.scroll_to(self.first + int(args[1]) * step)
+
+    def _scroll_break(self, delta):
+        self.scroll_to(self.first + delta)
+        return "break"
+
+    def _on_wheel(self, event):
+        return self._scroll_break(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)
+
+    def _on_configure(self, event):
+        # Grow or shrink the pool of items to the number of lines that fit.
+        box = self.tree.bbox(self._slots[0]) if self._shown[0] is not None else ""
+        if not box:
+            return
+        _, header, _, row_height = box
+        fit = (event.height - header) // max(1, row_height)
+        if fit > 0 and fit != len(self._slots):
+            self._resize(fit)
+            self.refresh()
+
+    def _on_select(self, _event):
+        selection = self.tree.selection()
+        if not selection:
+            # Scrolling the selected row out of view clears the tree selection; keep the row.
+            return
+        slot = self._slots.index(selection[0])
+        if self.first + slot < len(self.rows):
+            self._select(self.first + slot)
+
+    def _select(self, index):
+        self._selected = self._key_at(index)
+        self._selected_index = index
+
+    def _step(self, delta):
+        """Move the selection by delta rows, scrolling to keep it in view."""
+        if not self.rows:
+            return "break"
+        index = self.selected_index()
+        index = 0 if index is None else max(0, min(index + delta, len(self.rows) - 1))
+        self._select(index)
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + len(self._slots):
+            self.first = index - len(self._slots) + 1
+        self.refresh()
+        return "break"
+
+    def selected_index(self):
+        if self._selected is None:
+            return None
+        index = self._selected_index
+        if index is not None and index < len(self.rows) and self._key_at(index) == self._selected:
+            return index
+        # The rows moved under the selection; find its key again.
+        return None if self.key is None else self._index_of(self._selected)
+
+    def selected_row(self):
+        index = self.selected_index()
+        return None if index is None else self.rows[index]
+
+    def _index_of(self, key):
+        if self._positions is None:
+            self._positions = {}
+            for index, row in enumerate(self.rows):
+                self._positions.setdefault(self.key(row), index)
+        return self._positions.get(key)
+
+    def jump_to(self, key):
+        """Scroll to and select the first row with this key; False if there is none."""
+        return self.show_index(key if self.key is None else self._index_of(key))
+
+    def show_index(self, index):
+        """Scroll to and select the row at index; False if there is none."""
+        if index is None or not 0 <= index < len(self.rows):
+            return False
+        self._select(index)
+        self.first = self._clamp(index - len(self._slots) // 2)
+        self.refresh()
+        self.tree.focus_set()
+        return True
+
+
+class TreeBinder:
+    """Keeps a Treeview in step with a keyed list of rows by patching only what changed.
+
+    sync() takes (key, values) pairs in display order and issues the fewest
+    Tk calls that turn the current tree into that list: one batched delete for
+    rows that went away, an insert per new row, item() for rows whose values
+    changed and a move only for rows that changed places. Rows are never torn
+    down, so scroll position and selection survive a refresh.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._values = {}
+        self._order = []
+
+    def sync(self, rows):
+        rows = [(str(key), tuple(values)) for key, values in rows]
+        keep = {key for key, _ in rows}
+        gone = [key for key in self._order if key not in keep]
+        if gone:
+            self.tree.delete(*gone)
+        # Rows left in the tree, in tree order; walk them alongside the new order.
+        current = [key for key in self._order if key in keep]
+        placed = set()
+        cursor = 0
+        for position, (key, values) in enumerate(rows):
+            if key not in self._values:
+                self.tree.insert("", position, iid=key, values=values)
+            else:
+                while cursor < len(current) and current[cursor] in placed:
+                    cursor += 1
+                if cursor < len(current) and current[cursor] == key:
+                    cursor += 1
+                else:
+                    self.tree.move(key, "", position)
+                if self._values[key] != values:
+                    self.tree.item(key, values=values)
+            placed.add(key)
+        self._values = dict(rows)
+        self._order = [key for key, _ in rows]
+
+    def patch(self, key, values):
+        """Update one row already in the tree."""
+        key, values = str(key), tuple(values)
+        if self._values.get(key) != values:
+            self.tree.item(key, values=values)
+            self._values[key] = values
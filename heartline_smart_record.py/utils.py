@@ -6,6 +6,20 @@ RED = "\033[91m"
 YELLOW = "\033[93m"
 RESET = "\033[0m"
 
+_NUMPY = False
+
+
+def optional_numpy():
+    """NumPy if installed, else None; imported on first call so startup does not pay for it."""
+    global _NUMPY
+    if _NUMPY is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _NUMPY = numpy
+    return _NUMPY
+
 
 def typeprint(text, speed=0.05):
     """Print text with a gentle typing animation."""
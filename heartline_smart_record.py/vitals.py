@@ -27,22 +27,8 @@ from patient_ops import (
     priority_alerts,
 )
 from cli_app import run_cli
-from gui_app import (
-    gui_abnormal_summary,
-    gui_add_patient,
-    gui_plot_trend,
-    gui_search_patients,
-    gui_update_vitals,
-    gui_view_patients,
-    launch_gui,
-)
 from utils import RED, RESET, YELLOW, typeprint
-from tasks import load_tasks
-from timeline import load_timeline
-from soft_needs import load_soft_needs
-from patient_files import load_patient_files
-from medications import load_medications
-from team_chat import load_messages
+from sqlite_cache import warm_load
 
 __all__ = [
     "CSV_FILE",
@@ -83,21 +69,30 @@ __all__ = [
     "gui_plot_trend",
 ]
 
+# Tk, ttkbootstrap and Pillow load with gui_app, only once a GUI name is first used.
+GUI_EXPORTS = (
+    "launch_gui",
+    "gui_add_patient",
+    "gui_view_patients",
+    "gui_search_patients",
+    "gui_abnormal_summary",
+    "gui_update_vitals",
+    "gui_plot_trend",
+)
+
+
+def __getattr__(name):
+    if name in GUI_EXPORTS:
+        import gui_app
+
+        value = getattr(gui_app, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    patient_list = load_from_csv()
-    tasks = load_tasks()
-    timeline_entries = load_timeline()
-    soft_notes = load_soft_needs()
-    patient_files = load_patient_files()
-    medications = load_medications()
-    team_messages = load_messages()
-    launch_gui(
-        patient_list,
-        tasks,
-        timeline_entries,
-        soft_notes,
-        patient_files,
-        medications,
-        team_messages,
-    )
+    # Only the roster is needed for the first paint; launch_gui loads the other stores lazily.
+    from gui_app import launch_gui
+
+    launch_gui(warm_load("patients"))
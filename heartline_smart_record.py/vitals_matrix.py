@@ -0,0 +1,63 @@
+from array import array
+
+from data_access import as_patient
+from utils import optional_numpy
+
+
+class VitalsMatrix:
+    """The roster's vitals parsed once into typed columns for unit-wide checks.
+
+    hr, systolic, diastolic and temp_f copy each Patient's parsed vitals (plain
+    dict rows are parsed on the way in), with NaN where a value did not parse,
+    so every comparison against a missing value is False. With NumPy the
+    columns are float64 arrays and masks are boolean arrays; without it they
+    are array('d') columns and lists of bools.
+    """
+
+    def __init__(self, patients):
+        self.patients = list(patients)
+        hr = array("d")
+        systolic = array("d")
+        diastolic = array("d")
+        temp_f = array("d")
+        for patient in map(as_patient, self.patients):
+            hr.append(patient.hr)
+            systolic.append(patient.systolic)
+            diastolic.append(patient.diastolic)
+            temp_f.append(patient.temp_f)
+        self.np = optional_numpy()
+        if self.np is not None:
+            hr, systolic, diastolic, temp_f = (self.np.frombuffer(column, dtype=self.np.float64) for column in (hr, systolic, diastolic, temp_f))
+        self.hr = hr
+        self.systolic = systolic
+        self.diastolic = diastolic
+        self.temp_f = temp_f
+
+    def __len__(self):
+        return len(self.patients)
+
+    def outside(self, name, low, high):
+        """Mask of rows whose named column is below low or above high."""
+        column = getattr(self, name)
+        if self.np is not None:
+            return (column < low) | (column > high)
+        return [value < low or value > high for value in column]
+
+    def valid(self, name):
+        """Mask of rows where the named column parsed."""
+        column = getattr(self, name)
+        if self.np is not None:
+            return ~self.np.isnan(column)
+        return [value == value for value in column]
+
+
+def matrix_for(patient_list):
+    """The roster's VitalsMatrix, cached on a PatientRegistry until it changes."""
+    version = getattr(patient_list, "version", None)
+    cached = getattr(patient_list, "_vitals_matrix", None)
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    matrix = VitalsMatrix(patient_list)
+    if version is not None:
+        patient_list._vitals_matrix = (version, matrix)
+    return matrix
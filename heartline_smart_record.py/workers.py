@@ -0,0 +1,170 @@
+import atexit
+import itertools
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+IO_WORKERS = 4
+CPU_WORKERS = 2
+POLL_MS = 40
+
+# Held by whoever changes an in-memory store (roster, tasks, notes, ...) and by
+# background jobs while they copy from one, so a job never sees a half-made edit.
+STORE_LOCK = threading.RLock()
+
+
+class WorkerPool:
+    """Runs blocking jobs off the Tk thread and hands their results back to it.
+
+    submit(label, job, *args) runs job on a thread pool, or on a process pool
+    when cpu=True, and queues done(result) or failed(error) for the Tk thread.
+    attach(root) drains that queue with root.after while jobs are running, so
+    callbacks may touch widgets. Thread jobs submitted with progress=True get a
+    progress(done, total) keyword they may call from their own thread.
+    watch(listener) is told (count, label, fraction) whenever the running jobs
+    change: label is the oldest running job, fraction None until it reports.
+    """
+
+    def __init__(self, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.on_error = None
+        self._threads = None
+        self._processes = None
+        self._pools_lock = threading.Lock()
+        self._completed = queue.SimpleQueue()
+        self._ids = itertools.count()
+        self._running = {}
+        self._running_lock = threading.Lock()
+        self._listeners = []
+        self._status = (0, None, None)
+        self._root = None
+        self._polling = None
+
+    def _thread_pool(self):
+        with self._pools_lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.io_workers, thread_name_prefix="worker")
+            return self._threads
+
+    def _process_pool(self):
+        with self._pools_lock:
+            if self._processes is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # Spawned, not forked: forking a process that runs Tk and threads can deadlock the child.
+                self._processes = ProcessPoolExecutor(self.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._processes
+
+    def submit(self, label, job, *args, done=None, failed=None, cpu=False, progress=False):
+        if cpu and progress:
+            raise ValueError("Only thread jobs can report progress")
+        job_id = next(self._ids)
+        with self._running_lock:
+            self._running[job_id] = [label, None]
+        kwargs = {"progress": partial(self._progress, job_id)} if progress else {}
+        pool = self._process_pool() if cpu else self._thread_pool()
+        try:
+            future = pool.submit(job, *args, **kwargs)
+        except Exception:
+            with self._running_lock:
+                del self._running[job_id]
+            raise
+        future.add_done_callback(lambda finished: self._completed.put((job_id, finished, done, failed)))
+        self._changed()
+        self._poll_soon()
+        return future
+
+    def _progress(self, job_id, done, total):
+        with self._running_lock:
+            if job_id in self._running:
+                self._running[job_id][1] = done / total if total else None
+
+    def watch(self, listener):
+        self._listeners.append(listener)
+
+    def unwatch(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _changed(self):
+        with self._running_lock:
+            if self._running:
+                label, fraction = self._running[min(self._running)]
+                status = (len(self._running), label, fraction)
+            else:
+                status = (0, None, None)
+        if status != self._status:
+            self._status = status
+            for listener in list(self._listeners):
+                listener(*status)
+
+    def busy(self):
+        return self._status[0] > 0
+
+    def drain(self):
+        """Run the callbacks of finished jobs; call from the Tk thread."""
+        while True:
+            try:
+                job_id, future, done, failed = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            with self._running_lock:
+                self._running.pop(job_id, None)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            try:
+                if error is None:
+                    if done is not None:
+                        done(future.result())
+                elif failed is not None:
+                    failed(error)
+                elif self.on_error is not None:
+                    self.on_error(error)
+                else:
+                    traceback.print_exception(type(error), error, error.__traceback__)
+            except Exception:
+                # One bad callback must not strand the rest of the queue.
+                traceback.print_exc()
+        self._changed()
+
+    def attach(self, root):
+        """Deliver results on root's event loop; stop when root is destroyed."""
+        self._root = root
+
+        def on_destroy(event):
+            if event.widget is root:
+                self._root = self._polling = None
+
+        root.bind("<Destroy>", on_destroy, add="+")
+        self._poll_soon()
+
+    def _poll_soon(self):
+        if self._root is not None and self._polling is None and self._running:
+            self._polling = self._root.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        self._polling = None
+        try:
+            self.drain()
+        finally:
+            self._poll_soon()
+
+    def shutdown(self, wait=True):
+        with self._pools_lock:
+            pools, self._threads, self._processes = (self._threads, self._processes), None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+
+POOL = WorkerPool()
+atexit.register(POOL.shutdown)
+
+
+def submit(label, job, *args, **options):
+    return POOL.submit(label, job, *args, **options)